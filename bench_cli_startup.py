@@ -0,0 +1,61 @@
+"""
+Track the cold-start time of the headless CLI against a budget.
+
+Usage: python bench_cli_startup.py [runs] [budget_ms]
+
+Each run starts a fresh interpreter for `python -m pdfsplitter --help`, which parses
+arguments without touching a PDF. The overhead over a bare interpreter start is
+compared with the budget (default 150 ms) and the script exits 1 when it is exceeded,
+or when pypdf or Kivy were imported at all.
+"""
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_RUNS = 15
+DEFAULT_BUDGET_MS = 150.0
+
+# Modules the CLI must not import before a split actually runs
+FORBIDDEN = ('kivy', 'pypdf')
+
+IMPORT_CHECK = (
+    'import sys, json\n'
+    'from pdfsplitter import cli\n'
+    'cli.build_parser().parse_args(["in.pdf", "-o", "out"])\n'
+    'print(json.dumps(sorted({m.split(".")[0] for m in sys.modules})))\n'
+)
+
+
+def time_runs(cmd, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RUNS
+    budget_ms = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BUDGET_MS
+
+    bare = time_runs([sys.executable, '-c', 'pass'], runs)
+    cli = time_runs([sys.executable, '-m', 'pdfsplitter', '--help'], runs)
+    overhead = statistics.median(cli) - statistics.median(bare)
+    print(f'bare interpreter   median={statistics.median(bare):7.1f} ms')
+    print(f'pdfsplitter --help median={statistics.median(cli):7.1f} ms  max={max(cli):7.1f} ms')
+    print(f'overhead           {overhead:7.1f} ms  (budget {budget_ms:.0f} ms)')
+
+    out = subprocess.run([sys.executable, '-c', IMPORT_CHECK], check=True, capture_output=True, text=True).stdout
+    loaded = [m for m in json.loads(out) if m in FORBIDDEN]
+    print(f'forbidden imports  {", ".join(loaded) or "none"}')
+
+    ok = overhead <= budget_ms and not loaded
+    print('OK' if ok else 'OVER BUDGET')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
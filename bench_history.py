@@ -0,0 +1,190 @@
+"""
+Compare HistoryStore throughput with the connection-per-call behaviour it replaced.
+
+Usage: python bench_history.py [ops] [threads]
+
+"before" opens a fresh rollback-journal connection for every call, as the store used
+to; "after" is the current HistoryStore (a persistent WAL connection per thread).
+Each runs the same single-threaded add/update/get/list mix, then `threads` threads
+that each add and update jobs while one more thread keeps listing them, as a UI
+does while jobs run. Any "database is locked" error is counted and reported.
+
+Finally it compares job bookkeeping (add, mark running, mark succeeded) from the same
+threads written straight to the store, one commit each (with and without an fsync per
+commit), and through the HistoryWriter write-behind queue that JobManager uses.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from pdfsplitter.core.history import HistoryStore, HistoryWriter
+from pdfsplitter.core.models import HistoryRecord, JobStatus, SplitStrategy, now_utc
+
+DEFAULT_OPS = 2000
+DEFAULT_THREADS = 4
+
+
+class PerCallStore(HistoryStore):
+    """The previous behaviour: every call opens (and drops) its own connection."""
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+
+class FullSyncStore(HistoryStore):
+    """Every commit fsynced, as durable as HistoryWriter makes terminal states."""
+
+    def _open(self):
+        con = super()._open()
+        con.execute('PRAGMA synchronous = FULL')
+        return con
+
+
+def make_store(cls, path):
+    store = cls(path)
+    store._ensure_schema()
+    store._schema_ready = True
+    if cls is PerCallStore:
+        con = sqlite3.connect(path)
+        con.execute('PRAGMA journal_mode = DELETE')
+        con.close()
+    return store
+
+
+def record(i):
+    return HistoryRecord(
+        id=None,
+        created_at=now_utc(),
+        input_path=f'/data/in/report-{i}.pdf',
+        output_dir='/data/out',
+        strategy=SplitStrategy.EACH_PAGE,
+        params_json={'input_path': f'/data/in/report-{i}.pdf', 'output_dir': '/data/out'},
+        status=JobStatus.PENDING,
+        duration_ms=None,
+        output_count=None,
+        error_message=None,
+        output_sample=None,
+    )
+
+
+def rate(n, seconds):
+    return n / seconds if seconds > 0 else float('inf')
+
+
+def single_thread(store, ops):
+    results = {}
+    t0 = time.perf_counter()
+    ids = [store.add_job(record(i)) for i in range(ops)]
+    results['add_job'] = rate(ops, time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    for job_id in ids:
+        store.update_job(job_id, status=JobStatus.SUCCESS.value, duration_ms=1234, output_count=10)
+    results['update_job'] = rate(ops, time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    for job_id in ids:
+        store.get_job(job_id)
+    results['get_job'] = rate(ops, time.perf_counter() - t0)
+    lists = max(ops // 20, 1)
+    t0 = time.perf_counter()
+    for _ in range(lists):
+        store.list_jobs(limit=200)
+    results['list_jobs(200)'] = rate(lists, time.perf_counter() - t0)
+    return results
+
+
+def concurrent(store, ops, threads):
+    errors = []
+    done = threading.Event()
+    counts = {'writes': 0, 'reads': 0}
+    lock = threading.Lock()
+
+    def writer(offset):
+        for i in range(ops // threads):
+            try:
+                job_id = store.add_job(record(offset + i))
+                store.update_job(job_id, status=JobStatus.RUNNING.value)
+                store.update_job(job_id, status=JobStatus.SUCCESS.value, duration_ms=10)
+            except sqlite3.OperationalError as exc:
+                errors.append(str(exc))
+                continue
+            with lock:
+                counts['writes'] += 3
+
+    def reader():
+        while not done.is_set():
+            try:
+                store.list_jobs(limit=200)
+            except sqlite3.OperationalError as exc:
+                errors.append(str(exc))
+                continue
+            with lock:
+                counts['reads'] += 1
+
+    workers = [threading.Thread(target=writer, args=(k * ops,)) for k in range(threads)]
+    ui = threading.Thread(target=reader)
+    t0 = time.perf_counter()
+    ui.start()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - t0
+    done.set()
+    ui.join()
+    locked = sum('locked' in e for e in errors)
+    return rate(counts['writes'], elapsed), rate(counts['reads'], elapsed), locked, len(errors)
+
+
+def job_lifecycles(writes, jobs, threads):
+    """Jobs per second when `threads` threads each record jobs through `writes`."""
+
+    def worker(offset):
+        for i in range(jobs // threads):
+            job_id = writes.add_job(record(offset + i))
+            writes.update_job(job_id, status=JobStatus.RUNNING.value)
+            writes.update_job(job_id, status=JobStatus.SUCCESS.value, duration_ms=10, output_count=1)
+
+    workers = [threading.Thread(target=worker, args=(k * jobs,)) for k in range(threads)]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return rate(jobs // threads * threads, time.perf_counter() - t0)
+
+
+def main():
+    ops = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_OPS
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_THREADS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = {}
+        for name, cls in (('before', PerCallStore), ('after', HistoryStore)):
+            path = os.path.join(tmp, f'{name}.sqlite3')
+            single = single_thread(make_store(cls, path), ops)
+            runs[name] = (single, concurrent(make_store(cls, path), ops, threads))
+        direct = job_lifecycles(make_store(HistoryStore, os.path.join(tmp, 'normal.sqlite3')), ops // 4, threads)
+        synced = job_lifecycles(make_store(FullSyncStore, os.path.join(tmp, 'full.sqlite3')), ops // 4, threads)
+        writer = HistoryWriter(make_store(HistoryStore, os.path.join(tmp, 'behind.sqlite3')))
+        behind = job_lifecycles(writer, ops // 4, threads)
+        writer.close()
+
+    print(f'{"ops/s":<16}{"before":>12}{"after":>12}{"speedup":>10}')
+    for op in runs['before'][0]:
+        before, after = runs['before'][0][op], runs['after'][0][op]
+        print(f'{op:<16}{before:12.0f}{after:12.0f}{after / before:9.1f}x')
+    print(f'\nconcurrent: {threads} writer threads + 1 reader')
+    for name in ('before', 'after'):
+        writes, reads, locked, errors = runs[name][1]
+        print(f'{name:<8} writes/s={writes:9.0f}  lists/s={reads:7.0f}  "database is locked"={locked}  errors={errors}')
+    print(f'\njob bookkeeping: {threads} threads, add + running + success per job')
+    print(f'direct       jobs/s={direct:9.0f}  (one commit per write, synchronous=NORMAL)')
+    print(f'direct fsync jobs/s={synced:9.0f}  (one commit per write, synchronous=FULL)')
+    print(f'write-behind jobs/s={behind:9.0f}  (group commit, terminal states synchronous=FULL)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Compare reading the whole input into memory (the default) with memory-mapping it.
+
+Usage: python bench_mmap_input.py [input.pdf] [workers]
+
+Without an input a synthetic PDF with large per-page images is generated. Each case
+runs in a fresh process so peak RSS figures are not polluted by earlier cases.
+"""
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+from pdfsplitter.core.models import SplitJobParams, SplitStrategy
+from pdfsplitter.core.source import InputSource
+from pdfsplitter.core.splitter import split_pdf
+
+
+def make_pdf(path: str, pages: int = 200, image_bytes: int = 200_000):
+    w = PdfWriter()
+    for i in range(pages):
+        page = w.add_blank_page(width=612, height=792)
+        img = DecodedStreamObject()
+        img.set_data(os.urandom(image_bytes))
+        img.update({
+            NameObject('/Type'): NameObject('/XObject'),
+            NameObject('/Subtype'): NameObject('/Image'),
+            NameObject('/Width'): NumberObject(100),
+            NameObject('/Height'): NumberObject(image_bytes // 300),
+            NameObject('/ColorSpace'): NameObject('/DeviceRGB'),
+            NameObject('/BitsPerComponent'): NumberObject(8),
+        })
+        content = DecodedStreamObject()
+        content.set_data(b'q 100 0 0 100 72 72 cm /Im0 Do Q')
+        page[NameObject('/Contents')] = w._add_object(content)
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/XObject'): DictionaryObject({NameObject('/Im0'): w._add_object(img)}),
+        })
+    with open(path, 'wb') as f:
+        w.write(f)
+
+
+def run_case(input_pdf: str, out_dir: str, mmap_input: bool, workers, queue):
+    from pdfsplitter.core.memory import max_rss_bytes
+
+    t0 = time.perf_counter()
+    with InputSource(input_pdf, 'mmap' if mmap_input else 'memory') as source:
+        num_pages = len(source.reader.pages)
+    open_ms = (time.perf_counter() - t0) * 1000
+
+    params = SplitJobParams(
+        input_path=input_pdf,
+        output_dir=out_dir,
+        strategy=SplitStrategy.EVERY_N_PAGES,
+        pages_per_file=10,
+        mmap_input=mmap_input,
+        workers=workers,
+    )
+    t0 = time.perf_counter()
+    res = split_pdf(params)
+    split_ms = (time.perf_counter() - t0) * 1000
+    queue.put((num_pages, open_ms, split_ms, res.peak_rss_bytes or max_rss_bytes() or 0))
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix='pdfsplitter-bench-')
+    try:
+        if len(sys.argv) > 1:
+            input_pdf = sys.argv[1]
+        else:
+            input_pdf = os.path.join(tmp, 'input.pdf')
+            make_pdf(input_pdf)
+        workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+        print(f'input: {input_pdf} ({os.path.getsize(input_pdf) / 2**20:.1f} MiB)')
+
+        for label, mmap_input, n in (
+            ('memory, serial', False, None),
+            ('mmap, serial', True, None),
+            (f'memory, {workers} workers', False, workers),
+            (f'mmap, {workers} workers', True, workers),
+        ):
+            out_dir = os.path.join(tmp, 'out')
+            shutil.rmtree(out_dir, ignore_errors=True)
+            queue = multiprocessing.Queue()
+            proc = multiprocessing.Process(target=run_case, args=(input_pdf, out_dir, mmap_input, n, queue))
+            proc.start()
+            num_pages, open_ms, split_ms, peak = queue.get()
+            proc.join()
+            print(f'{label:<20} pages={num_pages} open={open_ms:8.1f} ms  split={split_ms:8.1f} ms  peak_rss={peak / 2**20:7.1f} MiB')
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
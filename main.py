@@ -1,4 +1,9 @@
-from pdfsplitter.app import main
+import multiprocessing
 
 if __name__ == "__main__":
+    # Split jobs run in spawned worker processes, which re-import this module: keep the
+    # UI import under the guard so workers never load Kivy
+    multiprocessing.freeze_support()
+    from pdfsplitter.app import main
+
     main()
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import os
+import sqlite3
+import threading
 from typing import Optional
 
 from kivy.app import App
 from kivy.clock import Clock
 from kivy.lang import Builder
+from kivy.logger import Logger
 from kivy.properties import BooleanProperty, NumericProperty, ObjectProperty, StringProperty
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.filechooser import FileChooserIconView
@@ -14,8 +17,11 @@ from kivy.uix.label import Label
 from kivy.metrics import dp
 from kivy.core.window import Window
 
+from .core.doc_cache import document_cache
+from .core.history import AsyncHistory, RetentionRunner
 from .core.job_manager import JobManager
-from .core.models import SplitJobParams, SplitStrategy
+from .core.models import ExecutionBackend, HistoryCursor, RetentionPolicy, SplitJobParams, SplitStrategy
+from .core.utils import RangeParseError, parse_page_spec
 from .os_integration import open_in_file_manager, reveal_in_file_manager
 
 
@@ -78,7 +84,7 @@ KV = r"""
         Spinner:
             id: strategy
             text: root.strategy_text
-            values: ['Ranges', 'Each Page', 'Every N Pages', 'Odd Pages Together', 'Even Pages Together']
+            values: ['Ranges', 'Each Page', 'Every N Pages', 'Odd Pages Together', 'Even Pages Together', 'By Outline', 'Max File Size']
             on_text: root.on_strategy_selected(self.text)
         TextInput:
             id: ranges
@@ -91,6 +97,18 @@ KV = r"""
             text: '' if root.pages_per_file <= 0 else str(root.pages_per_file)
             input_filter: 'int'
             on_text: root.pages_per_file = int(self.text) if self.text.isdigit() else 0
+        TextInput:
+            id: outline_depth
+            hint_text: 'Outline depth (for By Outline)'
+            text: str(root.outline_depth)
+            input_filter: 'int'
+            on_text: root.outline_depth = int(self.text) if self.text.isdigit() else root.outline_depth
+        TextInput:
+            id: max_mb
+            hint_text: 'MB per file (for Max File Size)'
+            text: '' if root.max_output_mb <= 0 else str(root.max_output_mb)
+            input_filter: 'float'
+            on_text: root.max_output_mb = float(self.text) if self.text.replace('.', '', 1).isdigit() else 0
 
     BoxLayout:
         size_hint_y: None
@@ -160,6 +178,7 @@ KV = r"""
             viewclass: 'HistoryItem'
             scroll_type: ['bars', 'content']
             bar_width: dp(10)
+            on_scroll_y: root.on_history_scroll()
             RecycleBoxLayout:
                 default_size: None, dp(40)
                 default_size_hint: 1, None
@@ -208,18 +227,38 @@ KV = r"""
         size_hint_x: None
         width: dp(80)
         on_release: app.rerun_history_job(root.job_id)
+    Button:
+        text: 'Resume'
+        size_hint_x: None
+        width: dp(80)
+        disabled: root.status == 'success'
+        on_release: app.resume_history_job(root.job_id)
 """
 
 
+# Jobs fetched per history query, and the most rows the history list holds at once
+HISTORY_PAGE_SIZE = 100
+HISTORY_WINDOW_SIZE = 500
+# Height of a HistoryItem, and how close to either end of the list (as a fraction of
+# the scroll range) the next page is requested
+HISTORY_ROW_HEIGHT = dp(40)
+HISTORY_PREFETCH = 0.1
+# Finished jobs older than a year move from the history database to its archive file
+HISTORY_RETENTION = RetentionPolicy(max_age_days=365)
+
+
 class AppRoot(BoxLayout):
     input_path = StringProperty('')
     output_dir = StringProperty('')
     strategy_text = StringProperty('Ranges')
     ranges_text = StringProperty('')
     pages_per_file = NumericProperty(0)
+    outline_depth = NumericProperty(1)
+    max_output_mb = NumericProperty(0)
     output_prefix = StringProperty('split')
     zero_pad_digits = NumericProperty(3)
     preserve_metadata = BooleanProperty(True)
+    input_page_count = NumericProperty(0)
 
     is_running = BooleanProperty(False)
     progress = NumericProperty(0.0)
@@ -228,8 +267,42 @@ class AppRoot(BoxLayout):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.job_manager = JobManager()
-        Clock.schedule_once(lambda dt: self.refresh_history(), 0.2)
+        # Splits run in worker processes so pypdf never holds this process's GIL
+        self.job_manager = JobManager(backend=ExecutionBackend.PROCESS)
+        # History queries run off the UI thread; results come back through the Kivy clock
+        self.history = AsyncHistory(
+            self.job_manager.history,
+            dispatch=lambda fn: Clock.schedule_once(lambda dt: fn(), 0),
+        )
+        self._history_generation = 0
+        self.retention = RetentionRunner(self.job_manager.history, HISTORY_RETENTION)
+        # Queued first on the history thread, which also starts every job, so no job is
+        # accepted before it is done: converting a pre-retention history file runs a full
+        # VACUUM, which would lock out the history writes of running jobs. Retention waits
+        # for it too.
+        self.history.submit(
+            self.job_manager.history.enable_incremental_vacuum,
+            on_result=lambda converted: self.retention.start(),
+            on_error=self._on_vacuum_error,
+        )
+        self._handle = None
+        self._cancel_requested = False
+        # The history list is a window onto the job table: the cursor of each row shown,
+        # whether jobs exist beyond either end, and whether a page is being fetched
+        self._history_keys = []
+        self._history_more_older = False
+        self._history_more_newer = False
+        self._history_loading = False
+        # The window is drawn first; the list fills in once the query returns
+        Clock.schedule_once(lambda dt: self.refresh_history(), 0)
+
+    def _on_vacuum_error(self, exc: BaseException) -> None:
+        if not isinstance(exc, sqlite3.Error):
+            raise exc
+        # Busy (another instance is running); retention still works, it just cannot
+        # shrink the file until a later start converts it
+        Logger.warning(f'PDFSplitter: history database not converted to incremental vacuum: {exc}')
+        self.retention.start()
 
     @property
     def can_run(self) -> bool:
@@ -237,11 +310,51 @@ class AppRoot(BoxLayout):
             return False
         strategy = self.get_strategy()
         if strategy.name == 'RANGES':
-            return bool(self.ranges_text.strip())
+            return bool(self.ranges_text.strip()) and self.validate_ranges() is None
         if strategy.name == 'EVERY_N_PAGES':
             return self.pages_per_file >= 1
+        if strategy.name == 'BY_OUTLINE':
+            return self.outline_depth >= 1
+        if strategy.name == 'MAX_BYTES':
+            return self.max_output_mb > 0
         return True
 
+    def validate_ranges(self) -> Optional[str]:
+        """Check the range text against the input's page count; returns an error message or None."""
+        if not self.input_page_count:
+            return None
+        try:
+            if not parse_page_spec(self.ranges_text, int(self.input_page_count)):
+                return f'No pages selected; the document has {int(self.input_page_count)} pages.'
+        except RangeParseError as exc:
+            return str(exc)
+        return None
+
+    def on_input_path(self, instance, value: str) -> None:
+        self.input_page_count = 0
+        if value.lower().endswith('.pdf') and os.path.isfile(value):
+            # Parsing can take a while on large files, so the count is read off the UI thread
+            threading.Thread(target=self._load_page_count, args=(value,), daemon=True).start()
+
+    def _load_page_count(self, path: str) -> None:
+        try:
+            # Process-backend splits parse the input in their own process and never see this
+            # process's document cache, so only a thread-backend split gains from keeping it
+            count = document_cache.page_count(path, cache=self.job_manager.backend == ExecutionBackend.THREAD)
+        except Exception as exc:
+            Clock.schedule_once(lambda dt: self._on_page_count(path, 0, exc), 0)
+            return
+        Clock.schedule_once(lambda dt: self._on_page_count(path, count, None), 0)
+
+    def _on_page_count(self, path: str, count: int, error: Optional[Exception]) -> None:
+        if path != self.input_path or self.is_running:
+            return
+        if error:
+            self.status_text = f"Unable to read PDF: {error}"
+            return
+        self.input_page_count = count
+        self.status_text = f"{count} pages"
+
     def on_strategy_selected(self, text: str) -> None:
         self.strategy_text = text
 
@@ -252,6 +365,8 @@ class AppRoot(BoxLayout):
             'Every N Pages': SplitStrategy.EVERY_N_PAGES,
             'Odd Pages Together': SplitStrategy.ODD_TOGETHER,
             'Even Pages Together': SplitStrategy.EVEN_TOGETHER,
+            'By Outline': SplitStrategy.BY_OUTLINE,
+            'Max File Size': SplitStrategy.MAX_BYTES,
         }
         return mapping.get(self.strategy_text, SplitStrategy.RANGES)
 
@@ -286,6 +401,11 @@ class AppRoot(BoxLayout):
     def run_split(self):
         if self.is_running:
             return
+        if self.get_strategy() == SplitStrategy.RANGES:
+            error = self.validate_ranges()
+            if error:
+                self.status_text = error
+                return
         self.is_running = True
         self.progress = 0
         self.status_text = 'Starting...'
@@ -295,14 +415,42 @@ class AppRoot(BoxLayout):
             strategy=self.get_strategy(),
             ranges_text=self.ranges_text or None,
             pages_per_file=self.pages_per_file or None,
+            outline_depth=max(1, int(self.outline_depth)),
+            max_output_bytes=int(self.max_output_mb * 1024 * 1024) or None,
             output_prefix=self.output_prefix or 'split',
             zero_pad_digits=max(1, int(self.zero_pad_digits)),
             preserve_metadata=bool(self.preserve_metadata),
         )
-        self._handle = self.job_manager.start_job(
-            params,
+        self.submit_job(self.job_manager.start_job, params)
+
+    def submit_job(self, start, *args) -> None:
+        """
+        Start a job with start(*args, on_progress=, on_complete=) on the history thread.
+
+        Starting a job records it in history, so it waits for the INSERT to commit; the
+        handle comes back through the Kivy clock. A cancel requested before then is
+        applied as soon as it arrives.
+        """
+        self._handle = None
+        self._cancel_requested = False
+
+        def on_started(handle):
+            self._handle = handle
+            if self._cancel_requested:
+                handle.cancel()
+            self.refresh_history()
+
+        def on_error(exc):
+            self.is_running = False
+            self.status_text = f"Failed: {exc}"
+
+        self.history.submit(
+            start,
+            *args,
             on_progress=lambda p, m: Clock.schedule_once(lambda dt: self._on_progress(p, m), 0),
             on_complete=lambda res, err, jid: Clock.schedule_once(lambda dt: self._on_complete(res, err, jid), 0),
+            on_result=on_started,
+            on_error=on_error,
         )
 
     def _on_progress(self, progress: float, message: str):
@@ -318,18 +466,106 @@ class AppRoot(BoxLayout):
         self.refresh_history()
 
     def cancel_split(self):
-        if hasattr(self, '_handle') and self._handle:
+        if not self.is_running:
+            return
+        self._cancel_requested = True
+        if self._handle:
             self._handle.cancel()
-            self.status_text = 'Cancelling...'
+        self.status_text = 'Cancelling...'
 
     def refresh_history(self):
-        jobs = self.job_manager.history.list_jobs(limit=200)
-        items = []
-        for j in jobs:
-            desc = f"{os.path.basename(j.input_path)} → {os.path.basename(j.output_dir)} [{j.strategy.value}]"
-            created = j.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            items.append({'job_id': j.id, 'created_at': created, 'desc': desc, 'status': j.status.value})
-        self.ids.history.data = items
+        """Reload the newest page of history and scroll back to the top."""
+        self._history_generation += 1
+        generation = self._history_generation
+        self._history_loading = True
+        self.history.list_jobs_page(
+            lambda page: self._on_history_page(generation, page, None),
+            on_error=lambda exc: self._on_history_error(generation, exc),
+            limit=HISTORY_PAGE_SIZE,
+        )
+
+    def on_history_scroll(self) -> None:
+        """Fetch the next page when the list is scrolled close to an end that has more jobs."""
+        if self._history_loading or not self._history_keys:
+            return
+        scroll_y = self.ids.history.scroll_y
+        if scroll_y <= HISTORY_PREFETCH and self._history_more_older:
+            self._load_history_page(after=self._history_keys[-1])
+        elif scroll_y >= 1 - HISTORY_PREFETCH and self._history_more_newer:
+            self._load_history_page(before=self._history_keys[0])
+
+    def _load_history_page(self, after: Optional[HistoryCursor] = None, before: Optional[HistoryCursor] = None):
+        generation = self._history_generation
+        self._history_loading = True
+        self.history.list_jobs_page(
+            lambda page: self._on_history_page(generation, page, 'older' if after else 'newer'),
+            on_error=lambda exc: self._on_history_error(generation, exc),
+            limit=HISTORY_PAGE_SIZE,
+            after=after,
+            before=before,
+        )
+
+    def _on_history_page(self, generation: int, page, direction: Optional[str]) -> None:
+        # A refresh was requested while this page was read; its result will follow
+        if generation != self._history_generation:
+            return
+        self._history_loading = False
+        rv = self.ids.history
+        items = [self._history_item(j) for j in page.jobs]
+        keys = [HistoryCursor.of(j) for j in page.jobs]
+        if direction is None:
+            rv.data = items
+            self._history_keys = keys
+            self._history_more_older = page.has_more
+            self._history_more_newer = False
+            rv.scroll_y = 1
+            return
+
+        offset = self._history_scroll_offset()
+        data = list(rv.data)
+        if direction == 'older':
+            data, self._history_keys = data + items, self._history_keys + keys
+            self._history_more_older = page.has_more
+            # Drop rows off the top to stay within the window; they can be fetched again
+            dropped = max(len(data) - HISTORY_WINDOW_SIZE, 0)
+            data, self._history_keys = data[dropped:], self._history_keys[dropped:]
+            if dropped:
+                self._history_more_newer = True
+            shift = -dropped
+        else:
+            data, self._history_keys = items + data, keys + self._history_keys
+            self._history_more_newer = page.has_more
+            excess = max(len(data) - HISTORY_WINDOW_SIZE, 0)
+            if excess:
+                data, self._history_keys = data[:-excess], self._history_keys[:-excess]
+                self._history_more_older = True
+            shift = len(items)
+        rv.data = data
+        # Keep the rows that were on screen in place despite the rows added or removed above them
+        self._set_history_scroll_offset(offset + shift * HISTORY_ROW_HEIGHT)
+
+    def _on_history_error(self, generation: int, error: BaseException) -> None:
+        if generation == self._history_generation:
+            self._history_loading = False
+            self.status_text = f"History unavailable: {error}"
+
+    def _history_scroll_offset(self) -> float:
+        """Distance in pixels from the top of the history list to the top of the viewport."""
+        rv = self.ids.history
+        scrollable = max(len(rv.data) * HISTORY_ROW_HEIGHT - rv.height, 0)
+        return (1 - rv.scroll_y) * scrollable
+
+    def _set_history_scroll_offset(self, offset: float) -> None:
+        rv = self.ids.history
+        scrollable = len(rv.data) * HISTORY_ROW_HEIGHT - rv.height
+        if scrollable > 0:
+            rv.scroll_y = min(max(1 - offset / scrollable, 0), 1)
+
+    @staticmethod
+    def _history_item(j) -> dict:
+        desc = f"{os.path.basename(j.input_path)} → {os.path.basename(j.output_dir)} [{j.strategy.value}]"
+        created = j.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        return {'job_id': j.id, 'created_at': created, 'desc': desc, 'status': j.status.value}
 
     def set_help(self, text: str):
         self.help_text = text
@@ -357,8 +593,7 @@ class AppRoot(BoxLayout):
         box.add_widget(btns)
         popup = Popup(title='Confirm', content=box, size_hint=(0.5, 0.35))
         def do_clear(instance):
-            self.job_manager.history.clear()
-            self.refresh_history()
+            self.history.clear(lambda _: self.refresh_history())
             popup.dismiss()
         ok.bind(on_release=do_clear)
         cancel.bind(on_release=lambda *_: popup.dismiss())
@@ -396,19 +631,29 @@ class KivyPDFSplitter(App):
         Window.bind(on_key_down=on_kbd)
         return root
 
+    def on_stop(self):
+        # Worker processes are not daemonic; stop them instead of waiting for them at exit
+        self.root.job_manager.shutdown()
+        self.root.history.shutdown()
+        self.root.retention.stop()
+
     def open_history_output(self, job_id: int):
-        rec = App.get_running_app().root.job_manager.history.get_job(job_id)
-        if rec and rec.output_dir:
-            open_in_file_manager(rec.output_dir)
+        def on_result(rec):
+            if rec and rec.output_dir:
+                open_in_file_manager(rec.output_dir)
+        App.get_running_app().root.history.get_job(job_id, on_result)
 
     def reveal_history_output(self, job_id: int):
-        rec = App.get_running_app().root.job_manager.history.get_job(job_id)
-        if rec and rec.output_dir:
-            reveal_in_file_manager(rec.output_dir)
+        def on_result(rec):
+            if rec and rec.output_dir:
+                reveal_in_file_manager(rec.output_dir)
+        App.get_running_app().root.history.get_job(job_id, on_result)
 
     def rerun_history_job(self, job_id: int):
+        App.get_running_app().root.history.get_job(job_id, self._apply_history_job)
+
+    def _apply_history_job(self, rec):
         app = App.get_running_app()
-        rec = app.root.job_manager.history.get_job(job_id)
         if not rec:
             return
         params_dict = rec.params_json
@@ -422,6 +667,8 @@ class KivyPDFSplitter(App):
             strategy=strategy,
             ranges_text=params_dict.get('ranges_text'),
             pages_per_file=params_dict.get('pages_per_file'),
+            outline_depth=int(params_dict.get('outline_depth', 1)),
+            max_output_bytes=params_dict.get('max_output_bytes'),
             output_prefix=params_dict.get('output_prefix', 'split'),
             zero_pad_digits=int(params_dict.get('zero_pad_digits', 3)),
             preserve_metadata=bool(params_dict.get('preserve_metadata', True)),
@@ -434,13 +681,27 @@ class KivyPDFSplitter(App):
             SplitStrategy.EVERY_N_PAGES: 'Every N Pages',
             SplitStrategy.ODD_TOGETHER: 'Odd Pages Together',
             SplitStrategy.EVEN_TOGETHER: 'Even Pages Together',
+            SplitStrategy.BY_OUTLINE: 'By Outline',
+            SplitStrategy.MAX_BYTES: 'Max File Size',
         }[strategy]
         app.root.ranges_text = params.ranges_text or ''
         app.root.pages_per_file = params.pages_per_file or 0
+        app.root.outline_depth = params.outline_depth
+        app.root.max_output_mb = (params.max_output_bytes or 0) / (1024 * 1024)
         app.root.output_prefix = params.output_prefix
         app.root.zero_pad_digits = params.zero_pad_digits
         app.root.preserve_metadata = params.preserve_metadata
 
+    def resume_history_job(self, job_id: int):
+        root = App.get_running_app().root
+        if root.is_running:
+            return
+        root.is_running = True
+        root.progress = 0
+        root.status_text = 'Verifying outputs...'
+        # resume_job reads and updates the job's row, so it runs on the history thread too
+        root.submit_job(root.job_manager.resume_job, job_id)
+
 
 def main():
     KivyPDFSplitter().run()
@@ -0,0 +1,159 @@
+"""
+Headless command line interface: python -m pdfsplitter INPUT -o OUTPUT_DIR [options]
+
+Imports nothing but the standard library and pdfsplitter.core.models until a split
+actually runs, so argument errors and --help return without loading pypdf, and Kivy is
+never imported. The result is printed to stdout as one JSON object.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import signal
+import sys
+import threading
+from dataclasses import asdict
+from typing import Any, Dict, Optional, Sequence
+
+from .core.models import ExecutionBackend, OutputProfile, SplitJobParams, SplitStrategy
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2  # argparse's own code for bad arguments
+EXIT_CANCELLED = 130
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pdfsplitter",
+        description="Split a PDF into several files and print the result as JSON.",
+    )
+    parser.add_argument("input_path", metavar="INPUT", help="PDF file to split")
+    parser.add_argument("-o", "--output-dir", required=True, help="directory for the output files")
+    parser.add_argument(
+        "-s",
+        "--strategy",
+        choices=[s.value for s in SplitStrategy],
+        default=SplitStrategy.EACH_PAGE.value,
+        help="how to split (default: %(default)s)",
+    )
+
+    strategy = parser.add_argument_group("strategy options")
+    strategy.add_argument("--ranges", dest="ranges_text", help='ranges: e.g. "1-3,5,10-", "1-100:2", "10-1"')
+    strategy.add_argument("--keep-range-order", action="store_true", help="ranges: one output per item, as written")
+    strategy.add_argument("--pages-per-file", type=int, help="every_n_pages: pages in each output")
+    strategy.add_argument("--outline-depth", type=int, default=1, help="by_outline: bookmark levels to split at")
+    strategy.add_argument("--max-output-bytes", type=int, help="max_bytes: size budget of each output")
+
+    naming = parser.add_argument_group("output options")
+    naming.add_argument("--prefix", dest="output_prefix", default="split", help="file name prefix")
+    naming.add_argument("--zero-pad", dest="zero_pad_digits", type=int, default=3, help="digits in output numbers")
+    naming.add_argument("--no-metadata", dest="preserve_metadata", action="store_false", help="drop document info")
+    naming.add_argument(
+        "--profile",
+        choices=[p.value for p in OutputProfile],
+        help="size/speed trade-off of the written files (default: fast)",
+    )
+    naming.add_argument("--prune-resources", action="store_true", help="drop resources pages do not use")
+    naming.add_argument("--passthrough", action="store_true", help="copy unmodified objects as raw bytes")
+    naming.add_argument("--fsync", dest="fsync_outputs", action="store_true", help="fsync outputs at the end")
+
+    tuning = parser.add_argument_group("performance options")
+    tuning.add_argument("--workers", type=int, help="write outputs in this many processes")
+    tuning.add_argument("--memory-limit-mb", type=int, help="streaming mode: keep RSS near this")
+    tuning.add_argument("--mmap-input", action="store_true", help="memory-map the input file")
+    tuning.add_argument(
+        "--no-document-cache", dest="use_document_cache", action="store_false", help="do not reuse parsed inputs"
+    )
+    tuning.add_argument("--io-queue-depth", type=int, help="overlap serialization and writes through this queue")
+
+    running = parser.add_argument_group("execution options")
+    running.add_argument(
+        "--backend",
+        choices=[b.value for b in ExecutionBackend],
+        default=ExecutionBackend.THREAD.value,
+        help="process runs the split in an isolated worker (default: %(default)s)",
+    )
+    running.add_argument("--time-limit-s", type=float, help="process backend: stop the job after this long")
+    running.add_argument("--address-space-limit-mb", type=int, help="process backend: hard memory cap")
+    running.add_argument("--progress", action="store_true", help="print progress lines to stderr")
+    running.add_argument(
+        "--progress-rate-hz", type=float, default=10.0, help="most progress lines per second (default: %(default)s)"
+    )
+    running.add_argument("--indent", type=int, help="pretty-print the JSON result")
+    return parser
+
+
+def params_from_args(args: argparse.Namespace) -> SplitJobParams:
+    return SplitJobParams(
+        input_path=args.input_path,
+        output_dir=args.output_dir,
+        strategy=SplitStrategy(args.strategy),
+        ranges_text=args.ranges_text,
+        pages_per_file=args.pages_per_file,
+        outline_depth=args.outline_depth,
+        max_output_bytes=args.max_output_bytes,
+        output_prefix=args.output_prefix,
+        zero_pad_digits=args.zero_pad_digits,
+        preserve_metadata=args.preserve_metadata,
+        workers=args.workers,
+        prune_resources=args.prune_resources,
+        memory_limit_mb=args.memory_limit_mb,
+        mmap_input=args.mmap_input,
+        use_document_cache=args.use_document_cache,
+        passthrough=args.passthrough,
+        profile=OutputProfile(args.profile) if args.profile else None,
+        fsync_outputs=args.fsync_outputs,
+        io_queue_depth=args.io_queue_depth,
+        keep_range_order=args.keep_range_order,
+        progress_rate_hz=args.progress_rate_hz,
+        time_limit_s=args.time_limit_s,
+        address_space_limit_mb=args.address_space_limit_mb,
+    )
+
+
+def _print_progress(fraction: float, message: str) -> None:
+    print(f"{fraction * 100:5.1f}% {message}", file=sys.stderr, flush=True)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    params = params_from_args(args)
+
+    cancel = threading.Event()
+
+    def on_signal(signum: int, frame: Any) -> None:
+        cancel.set()
+
+    # Ctrl+C and container stop requests cancel the split cleanly instead of killing it mid-write
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, on_signal)
+
+    # Deferred: these pull in pypdf
+    from .core.splitter import SplitCancelled
+
+    if args.backend == ExecutionBackend.PROCESS.value:
+        from .core.process_backend import run_in_process as run
+    else:
+        from .core.splitter import split_pdf as run
+
+    report: Dict[str, Any] = {"input_path": params.input_path, "strategy": params.strategy.value}
+    try:
+        result = run(
+            params,
+            progress_callback=_print_progress if args.progress else None,
+            should_cancel=cancel.is_set,
+        )
+    except SplitCancelled:
+        report.update(status="cancelled")
+        code = EXIT_CANCELLED
+    except Exception as exc:
+        report.update(status="failed", error=str(exc), error_type=type(exc).__name__)
+        code = EXIT_FAILED
+    else:
+        report.update(status="success", **asdict(result))
+        code = EXIT_OK
+    json.dump(report, sys.stdout, indent=args.indent)
+    sys.stdout.write("\n")
+    return code
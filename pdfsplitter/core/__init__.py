@@ -2,5 +2,19 @@ __all__ = [
     "models",
     "utils",
     "history",
+    "archive",
     "splitter",
+    "resources",
+    "memory",
+    "source",
+    "doc_cache",
+    "passthrough",
+    "optimize",
+    "output",
+    "pipeline",
+    "plan",
+    "outline",
+    "sizing",
+    "progress",
+    "process_backend",
 ]
@@ -0,0 +1,119 @@
+"""
+Append-only archive of jobs removed from the history database.
+
+The archive is gzip-compressed JSON Lines, one job per line. Every append writes a
+new gzip member, so existing data is never rewritten, and a crash mid-append can only
+damage the member being written (HistoryStore cuts such a tail off before its next
+append). The functions here need nothing but the file, so archived jobs can be
+inspected offline, without the database or the app.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .models import TELEMETRY_FIELDS, HistoryRecord, JobStatus, SplitStrategy
+
+
+def append_archive(path: str, records: Iterable[HistoryRecord]) -> int:
+    """Append records to the archive at path and fsync it; returns how many were written."""
+    lines = [json.dumps(_to_json(rec), separators=(",", ":")) + "\n" for rec in records]
+    if not lines:
+        return 0
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            gz.write("".join(lines).encode("utf-8"))
+        raw.flush()
+        # The caller deletes the rows once this returns; they must not exist only in memory
+        os.fsync(raw.fileno())
+    return len(lines)
+
+
+def iter_archive(path: str) -> Iterator[HistoryRecord]:
+    """
+    Every job in the archive, in the order they were archived.
+
+    A torn final member (an append in progress, or cut short by a crash) ends the
+    iteration quietly.
+    """
+    if not os.path.exists(path):
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                try:
+                    yield _from_json(json.loads(line))
+                except ValueError:
+                    # A line cut short by a crash during the last append
+                    return
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            return
+
+
+def query_archive(
+    path: str,
+    search: Optional[str] = None,
+    status: Optional[JobStatus] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> List[HistoryRecord]:
+    """
+    Archived jobs, newest first, filtered like HistoryStore.list_jobs.
+
+    `search` is a case-insensitive substring of the input path, output dir or error
+    message; `since` and `until` bound created_at (inclusive, exclusive).
+    """
+    needle = search.lower() if search else None
+    result: List[HistoryRecord] = []
+    for rec in iter_archive(path):
+        if status and rec.status != status:
+            continue
+        if since and rec.created_at < since:
+            continue
+        if until and rec.created_at >= until:
+            continue
+        if needle and not any(needle in (text or "").lower() for text in (rec.input_path, rec.output_dir, rec.error_message)):
+            continue
+        result.append(rec)
+    result.sort(key=lambda r: (r.created_at, r.id), reverse=True)
+    return result[:limit] if limit is not None else result
+
+
+def _to_json(rec: HistoryRecord) -> Dict[str, Any]:
+    return {
+        "id": rec.id,
+        "created_at": rec.created_at.isoformat(),
+        "input_path": rec.input_path,
+        "output_dir": rec.output_dir,
+        "strategy": rec.strategy.value,
+        "params_json": rec.params_json,
+        "status": rec.status.value,
+        "duration_ms": rec.duration_ms,
+        "output_count": rec.output_count,
+        "error_message": rec.error_message,
+        "output_sample": rec.output_sample,
+        **{name: getattr(rec, name) for name in TELEMETRY_FIELDS},
+    }
+
+
+def _from_json(data: Dict[str, Any]) -> HistoryRecord:
+    return HistoryRecord(
+        id=data["id"],
+        created_at=datetime.fromisoformat(data["created_at"]),
+        input_path=data["input_path"],
+        output_dir=data["output_dir"],
+        strategy=SplitStrategy(data["strategy"]),
+        params_json=data.get("params_json") or {},
+        status=JobStatus(data["status"]),
+        duration_ms=data.get("duration_ms"),
+        output_count=data.get("output_count"),
+        error_message=data.get("error_message"),
+        output_sample=data.get("output_sample"),
+        # Absent from lines archived before telemetry was recorded
+        **{name: data.get(name) for name in TELEMETRY_FIELDS},
+    )
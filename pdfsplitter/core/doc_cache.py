@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+
+from pypdf import PdfReader
+
+from .source import InputSource
+
+
+DocumentKey = Tuple[str, int, int]  # (realpath, size, mtime_ns)
+
+
+def document_key(path: str) -> DocumentKey:
+    real = os.path.realpath(path)
+    st = os.stat(real)
+    return real, st.st_size, st.st_mtime_ns
+
+
+@dataclass
+class _CachedDocument:
+    source: InputSource
+    num_pages: int
+    size_bytes: int
+    lock: threading.Lock
+
+
+class DocumentCache:
+    """
+    In-process LRU cache of parsed input documents.
+
+    Entries are keyed on (realpath, size, mtime_ns) so an edited file is re-parsed, and
+    bounded by entry count and by a byte budget estimated from the input file size.
+    A PdfReader is not thread-safe: lease() hands out a cached reader only when no other
+    caller is using it, and falls back to a private, uncached reader otherwise.
+    """
+
+    def __init__(self, max_entries: int = 4, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[DocumentKey, _CachedDocument]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lease(self, path: str, mode: str = "memory") -> Iterator[PdfReader]:
+        """
+        Yield a parsed reader for path, reusing a cached one when possible.
+
+        Streaming ("file" mode) readers are never cached, since the point of that mode is
+        not to pin the document in memory.
+        """
+        entry: Optional[_CachedDocument] = None
+        if mode != "file":
+            entry = self._get_or_load(path, mode)
+        if entry is not None and entry.lock.acquire(blocking=False):
+            try:
+                yield entry.source.reader
+            finally:
+                entry.lock.release()
+            return
+        with InputSource(path, mode) as source:
+            yield source.reader
+
+    def page_count(self, path: str, cache: bool = True) -> int:
+        """
+        Number of pages in path, parsing and caching the document on a miss.
+
+        With cache=False a cached document is still used, but a miss is counted from a
+        streaming reader that is closed straight away, for callers whose split runs in
+        another process and so cannot reuse this cache.
+        """
+        if not cache:
+            with self._lock:
+                entry = self._entries.get(document_key(path))
+        else:
+            entry = self._get_or_load(path, "memory")
+        if entry is not None:
+            return entry.num_pages
+        with InputSource(path, "file") as source:
+            return len(source.reader.pages)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _get_or_load(self, path: str, mode: str) -> Optional[_CachedDocument]:
+        key = document_key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        if key[1] > self.max_bytes:
+            return None
+
+        # Parse outside the cache lock so lookups of other documents are not blocked
+        source = InputSource(path, mode)
+        try:
+            num_pages = len(source.reader.pages)
+        except Exception:
+            source.close()
+            raise
+        entry = _CachedDocument(source=source, num_pages=num_pages, size_bytes=key[1], lock=threading.Lock())
+
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                # Another thread loaded it first; keep theirs
+                source.close()
+                return existing
+            # Older versions of the same file can never be hit again
+            for stale in [k for k in self._entries if k[0] == key[0]]:
+                self._evict(stale)
+            self._entries[key] = entry
+            self._bytes += entry.size_bytes
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._evict(next(iter(self._entries)))
+        return entry
+
+    def _evict(self, key: DocumentKey) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size_bytes
+        self.evictions += 1
+        # A leased reader keeps working; its stream is released once the last reference goes
+        if entry.lock.acquire(blocking=False):
+            try:
+                entry.source.close()
+            finally:
+                entry.lock.release()
+
+
+#: Process-wide cache shared by split jobs and the UI.
+document_cache = DocumentCache()
@@ -2,20 +2,142 @@ from __future__ import annotations
 
 import json
 import os
+import re
 import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import asdict
-from typing import Any, Dict, Iterable, List, Optional, Tuple
-from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
 
 from platformdirs import user_data_dir
 
-from .models import HistoryRecord, JobStatus, SplitStrategy, now_utc
+from .archive import append_archive
+from .models import (
+    TELEMETRY_FIELDS,
+    HistoryCursor,
+    HistoryPage,
+    HistoryRecord,
+    JobOutputRecord,
+    JobStats,
+    JobStatus,
+    RetentionPolicy,
+    RetentionStats,
+    SplitStrategy,
+    StatsWindow,
+    now_utc,
+)
 
 
 _APP_NAME = "KivyPDFSplitter"
 _APP_AUTHOR = "ModernTools"
 _DB_NAME = "history.sqlite3"
 
+# How long a writer waits for another connection's write transaction before giving up
+_BUSY_TIMEOUT_S = 30.0
+# Page cache per connection, in KiB (negative values are sizes, not page counts, in SQLite)
+_CACHE_SIZE_KIB = 8192
+# States a job never leaves; HistoryWriter commits them durably before update_job returns
+_TERMINAL_STATUSES = {JobStatus.SUCCESS.value, JobStatus.FAILED.value, JobStatus.CANCELLED.value}
+# Free pages released per incremental_vacuum step; each step is a short write transaction
+_VACUUM_STEP_PAGES = 256
+
+# Full-text index over the searchable job columns. External content: the text lives only in
+# jobs, and the triggers below keep the index in step with every insert, update and delete.
+_FTS_SCHEMA = (
+    """
+    CREATE VIRTUAL TABLE jobs_fts USING fts5(
+        input_path, output_dir, strategy, error_message,
+        content='jobs', content_rowid='id', prefix='2 3'
+    );
+    """,
+    """
+    CREATE TRIGGER jobs_fts_insert AFTER INSERT ON jobs BEGIN
+        INSERT INTO jobs_fts(rowid, input_path, output_dir, strategy, error_message)
+        VALUES (new.id, new.input_path, new.output_dir, new.strategy, new.error_message);
+    END;
+    """,
+    """
+    CREATE TRIGGER jobs_fts_delete AFTER DELETE ON jobs BEGIN
+        INSERT INTO jobs_fts(jobs_fts, rowid, input_path, output_dir, strategy, error_message)
+        VALUES ('delete', old.id, old.input_path, old.output_dir, old.strategy, old.error_message);
+    END;
+    """,
+    """
+    CREATE TRIGGER jobs_fts_update AFTER UPDATE OF input_path, output_dir, strategy, error_message ON jobs BEGIN
+        INSERT INTO jobs_fts(jobs_fts, rowid, input_path, output_dir, strategy, error_message)
+        VALUES ('delete', old.id, old.input_path, old.output_dir, old.strategy, old.error_message);
+        INSERT INTO jobs_fts(rowid, input_path, output_dir, strategy, error_message)
+        VALUES (new.id, new.input_path, new.output_dir, new.strategy, new.error_message);
+    END;
+    """,
+)
+# bm25 weights of the indexed columns, in order: a hit in the file name matters most
+_FTS_WEIGHTS = "4.0, 2.0, 1.0, 1.0"
+
+# Schema changes after the original tables, applied in order; PRAGMA user_version counts
+# how many a database has had. Append only: never edit or reorder a shipped entry.
+_MIGRATIONS: Tuple[Tuple[str, ...], ...] = (
+    # 1: per-job performance telemetry
+    (
+        "ALTER TABLE jobs ADD COLUMN input_bytes INTEGER",
+        "ALTER TABLE jobs ADD COLUMN output_bytes INTEGER",
+        "ALTER TABLE jobs ADD COLUMN pages_processed INTEGER",
+        "ALTER TABLE jobs ADD COLUMN pages_per_sec REAL",
+        "ALTER TABLE jobs ADD COLUMN peak_rss_bytes INTEGER",
+        "ALTER TABLE jobs ADD COLUMN open_ms INTEGER",
+        "ALTER TABLE jobs ADD COLUMN plan_ms INTEGER",
+        "ALTER TABLE jobs ADD COLUMN write_ms INTEGER",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)",
+    ),
+)
+
+_JOB_COLUMNS = (
+    "jobs.id, jobs.created_at, jobs.input_path, jobs.output_dir, jobs.strategy, jobs.params_json, "
+    "jobs.status, jobs.duration_ms, jobs.output_count, jobs.error_message, jobs.output_sample, "
+    + ", ".join(f"jobs.{name}" for name in TELEMETRY_FIELDS)
+)
+
+# Start of the window containing created_at, per StatsWindow, as an ISO string
+_WINDOW_SQL = {
+    StatsWindow.HOUR: "substr(created_at, 1, 13) || ':00'",
+    StatsWindow.DAY: "substr(created_at, 1, 10)",
+    StatsWindow.WEEK: "date(created_at, '-6 days', 'weekday 1')",
+    StatsWindow.MONTH: "substr(created_at, 1, 7) || '-01'",
+}
+
+
+def _record_from_row(row: Tuple[Any, ...]) -> HistoryRecord:
+    (rid, created_at, input_path, output_dir, strategy, params_json, status, duration_ms, output_count, error_message, output_sample) = row[:11]
+    return HistoryRecord(
+        id=int(rid),
+        created_at=datetime.fromisoformat(created_at),
+        input_path=input_path,
+        output_dir=output_dir,
+        strategy=SplitStrategy(strategy),
+        params_json=json.loads(params_json),
+        status=JobStatus(status),
+        duration_ms=duration_ms,
+        output_count=output_count,
+        error_message=error_message,
+        output_sample=json.loads(output_sample) if output_sample else None,
+        **dict(zip(TELEMETRY_FIELDS, row[11:])),
+    )
+
+
+def _fts_query(search: str) -> Optional[str]:
+    """
+    FTS5 query matching every whitespace-separated word of `search` as a prefix.
+
+    Each word is quoted, so punctuation inside it ("report-2024.pdf") becomes a phrase of
+    its tokens rather than query syntax. None when nothing in `search` is indexable.
+    """
+    terms = [t for t in search.split() if re.search(r"\w", t)]
+    if not terms:
+        return None
+    return " ".join('"{}"*'.format(t.replace('"', '""')) for t in terms)
+
 
 def _db_path() -> str:
     base = user_data_dir(_APP_NAME, _APP_AUTHOR, ensure_exists=True)
@@ -23,14 +145,64 @@ def _db_path() -> str:
 
 
 class HistoryStore:
+    """
+    Job history in a SQLite file.
+
+    Each thread keeps one connection open for the life of the store (sqlite3 connections
+    cannot be shared between threads), so calls reuse its prepared statements and page
+    cache instead of reopening the file. The database runs in WAL mode: readers never
+    block the writer or each other, and concurrent writers queue on the busy timeout
+    instead of failing with "database is locked".
+    """
+
     def __init__(self, path: Optional[str] = None) -> None:
         self.path = path or _db_path()
-        self._ensure_schema()
+        # Jobs removed by apply_retention; see archive.query_archive
+        self.archive_path = os.path.splitext(self.path)[0] + "-archive.jsonl.gz"
+        # The schema is created on first use, so constructing a store never touches the disk
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        # False when this SQLite build lacks FTS5; search then falls back to LIKE scans
+        self._fts = False
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            if not self._schema_ready:
+                with self._schema_lock:
+                    if not self._schema_ready:
+                        self._ensure_schema()
+                        self._schema_ready = True
+            con = self._open()
+            self._local.con = con
+        return con
+
+    def _open(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=_BUSY_TIMEOUT_S)
+        # NORMAL is durable across application crashes in WAL mode; only power loss can
+        # roll back the last few commits, never corrupt the file
+        con.execute("PRAGMA synchronous = NORMAL")
+        con.execute(f"PRAGMA cache_size = -{_CACHE_SIZE_KIB}")
+        con.execute("PRAGMA temp_store = MEMORY")
+        return con
+
+    def close(self) -> None:
+        """Close the calling thread's connection; other threads' close when they exit."""
+        con = getattr(self._local, "con", None)
+        if con is not None:
+            self._local.con = None
+            con.close()
 
     def _ensure_schema(self) -> None:
-        con = sqlite3.connect(self.path)
+        con = sqlite3.connect(self.path, timeout=_BUSY_TIMEOUT_S)
         try:
             cur = con.cursor()
+            # Only takes effect before the first table exists; older files are converted by
+            # enable_incremental_vacuum. Lets retention hand freed pages back a few at a time.
+            cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            # Persistent: recorded in the file, so every later connection opens in WAL mode
+            cur.execute("PRAGMA journal_mode = WAL")
             cur.execute(
                 """
                 CREATE TABLE IF NOT EXISTS jobs (
@@ -48,43 +220,108 @@ class HistoryStore:
                 );
                 """
             )
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at DESC);")
+            # Serves both newest-first listing and the (created_at, id) cursors of list_jobs_page
+            cur.execute("DROP INDEX IF EXISTS idx_jobs_created;")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_id ON jobs(created_at DESC, id DESC);")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);")
-            con.commit()
-        finally:
-            con.close()
-
-    def add_job(self, rec: HistoryRecord) -> int:
-        con = sqlite3.connect(self.path)
-        try:
-            cur = con.cursor()
+            # One row per output a job has finished writing; resume_job skips these
             cur.execute(
                 """
-                INSERT INTO jobs (created_at, input_path, output_dir, strategy, params_json, status, duration_ms, output_count, error_message, output_sample)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    rec.created_at.isoformat(),
-                    rec.input_path,
-                    rec.output_dir,
-                    rec.strategy.value,
-                    json.dumps(rec.params_json),
-                    rec.status.value,
-                    rec.duration_ms,
-                    rec.output_count,
-                    rec.error_message,
-                    json.dumps(rec.output_sample) if rec.output_sample is not None else None,
-                ),
+                CREATE TABLE IF NOT EXISTS job_outputs (
+                    job_id INTEGER NOT NULL,
+                    idx INTEGER NOT NULL,
+                    pages TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (job_id, idx)
+                );
+                """
             )
+            cur.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);")
             con.commit()
-            return int(cur.lastrowid)
+            self._migrate(con)
+            self._fts = self._ensure_fts(con)
         finally:
             con.close()
 
+    def _migrate(self, con: sqlite3.Connection) -> None:
+        """Apply the _MIGRATIONS the database has not had yet, each in its own transaction."""
+        for version, statements in enumerate(_MIGRATIONS, start=1):
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                # Read under the write lock: another process may have migrated meanwhile
+                if con.execute("PRAGMA user_version").fetchone()[0] < version:
+                    for statement in statements:
+                        con.execute(statement)
+                    con.execute(f"PRAGMA user_version = {version}")
+                con.commit()
+            except BaseException:
+                con.rollback()
+                raise
+
+    def _ensure_fts(self, con: sqlite3.Connection) -> bool:
+        """
+        Create the search index if it is missing, indexing the jobs already recorded.
+
+        This is also the migration of databases written before the index existed. It runs
+        in one immediate transaction, so two processes opening the same file build it once.
+        """
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            exists = con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'jobs_fts'").fetchone()
+            if not exists:
+                for statement in _FTS_SCHEMA:
+                    con.execute(statement)
+                con.execute("INSERT INTO jobs_fts(jobs_fts) VALUES ('rebuild')")
+            con.commit()
+            return True
+        except sqlite3.OperationalError:
+            # "no such module: fts5"
+            con.rollback()
+            return False
+
+    def add_job(self, rec: HistoryRecord) -> int:
+        con = self._connect()
+        with con:
+            return self._insert_job(con, rec)
+
+    def _insert_job(self, con: sqlite3.Connection, rec: HistoryRecord) -> int:
+        """INSERT a job on con without committing; returns its id."""
+        cur = con.cursor()
+        cur.execute(
+            """
+            INSERT INTO jobs (created_at, input_path, output_dir, strategy, params_json, status, duration_ms, output_count, error_message, output_sample,
+                              input_bytes, output_bytes, pages_processed, pages_per_sec, peak_rss_bytes, open_ms, plan_ms, write_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                rec.created_at.isoformat(),
+                rec.input_path,
+                rec.output_dir,
+                rec.strategy.value,
+                json.dumps(rec.params_json),
+                rec.status.value,
+                rec.duration_ms,
+                rec.output_count,
+                rec.error_message,
+                json.dumps(rec.output_sample) if rec.output_sample is not None else None,
+                *(getattr(rec, name) for name in TELEMETRY_FIELDS),
+            ),
+        )
+        return int(cur.lastrowid)
+
     def update_job(self, job_id: int, **fields: Any) -> None:
+        con = self._connect()
+        with con:
+            self._update_job(con, job_id, fields)
+
+    def _update_job(self, con: sqlite3.Connection, job_id: int, fields: Dict[str, Any]) -> None:
+        """UPDATE a job's allowed fields on con without committing."""
         if not fields:
             return
-        allowed = {"status", "duration_ms", "output_count", "error_message", "output_sample"}
+        allowed = {"status", "duration_ms", "output_count", "error_message", "output_sample", *TELEMETRY_FIELDS}
         sets = []
         values: List[Any] = []
         for key, value in fields.items():
@@ -97,13 +334,7 @@ class HistoryStore:
                 values.append(value)
         if not sets:
             return
-        con = sqlite3.connect(self.path)
-        try:
-            cur = con.cursor()
-            cur.execute(f"UPDATE jobs SET {', '.join(sets)} WHERE id = ?", (*values, job_id))
-            con.commit()
-        finally:
-            con.close()
+        con.execute(f"UPDATE jobs SET {', '.join(sets)} WHERE id = ?", (*values, job_id))
 
     def list_jobs(
         self,
@@ -112,78 +343,591 @@ class HistoryStore:
         status: Optional[JobStatus] = None,
         search: Optional[str] = None,
     ) -> List[HistoryRecord]:
+        """
+        Jobs, newest first, optionally filtered by status and a search string.
+
+        With the full-text index, `search` matches jobs whose input path, output dir,
+        strategy or error message contain words starting with each of its words, best
+        matches first. Without it (no FTS5), `search` is a substring of the input path or
+        output dir, as before the index existed.
+        """
+        con = self._connect()
         where = []
         params: List[Any] = []
+        from_sql = "jobs"
+        order_sql = "jobs.created_at DESC"
         if status:
-            where.append("status = ?")
+            where.append("jobs.status = ?")
             params.append(status.value)
         if search:
-            where.append("(input_path LIKE ? OR output_dir LIKE ?)" )
-            like = f"%{search}%"
-            params.extend([like, like])
+            match = _fts_query(search) if self._fts else None
+            if match:
+                from_sql = "jobs JOIN jobs_fts ON jobs_fts.rowid = jobs.id"
+                where.append("jobs_fts MATCH ?")
+                params.append(match)
+                order_sql = f"bm25(jobs_fts, {_FTS_WEIGHTS}), {order_sql}"
+            else:
+                where.append("(jobs.input_path LIKE ? OR jobs.output_dir LIKE ?)")
+                like = f"%{search}%"
+                params.extend([like, like])
         where_sql = f"WHERE {' AND '.join(where)}" if where else ""
-        sql = f"SELECT id, created_at, input_path, output_dir, strategy, params_json, status, duration_ms, output_count, error_message, output_sample FROM jobs {where_sql} ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        sql = f"SELECT {_JOB_COLUMNS} FROM {from_sql} {where_sql} ORDER BY {order_sql} LIMIT ? OFFSET ?"
         params.extend([limit, offset])
-        con = sqlite3.connect(self.path)
-        try:
+        with con:
             cur = con.cursor()
             cur.execute(sql, params)
             rows = cur.fetchall()
-        finally:
-            con.close()
-        result: List[HistoryRecord] = []
-        for row in rows:
-            (rid, created_at, input_path, output_dir, strategy, params_json, status, duration_ms, output_count, error_message, output_sample) = row
-            result.append(
-                HistoryRecord(
-                    id=int(rid),
-                    created_at=datetime.fromisoformat(created_at),
-                    input_path=input_path,
-                    output_dir=output_dir,
-                    strategy=SplitStrategy(strategy),
-                    params_json=json.loads(params_json),
-                    status=JobStatus(status),
-                    duration_ms=duration_ms,
-                    output_count=output_count,
-                    error_message=error_message,
-                    output_sample=json.loads(output_sample) if output_sample else None,
-                )
+        return [_record_from_row(row) for row in rows]
+
+    def list_jobs_page(
+        self,
+        limit: int = 100,
+        after: Optional[HistoryCursor] = None,
+        before: Optional[HistoryCursor] = None,
+        status: Optional[JobStatus] = None,
+    ) -> HistoryPage:
+        """
+        Up to `limit` jobs, newest first, strictly older than `after` or strictly newer than `before`.
+
+        Pages are addressed by the (created_at, id) of a neighbouring job rather than by
+        offset, so reading deep into a large history costs one index seek instead of
+        skipping every newer row, and a page does not shift when jobs are added meanwhile.
+        Pass HistoryCursor.of(page.jobs[-1]) as `after` for the next (older) page, or
+        HistoryCursor.of(page.jobs[0]) as `before` for the previous one.
+        """
+        if after is not None and before is not None:
+            raise ValueError("Pass either after or before, not both.")
+        con = self._connect()
+        where = []
+        params: List[Any] = []
+        if status:
+            where.append("status = ?")
+            params.append(status.value)
+        if after is not None:
+            where.append("(created_at, id) < (?, ?)")
+            params.extend([after.created_at.isoformat(), after.id])
+        if before is not None:
+            where.append("(created_at, id) > (?, ?)")
+            params.extend([before.created_at.isoformat(), before.id])
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        # Newer pages are read upwards from the cursor and flipped afterwards
+        order_sql = "created_at ASC, id ASC" if before is not None else "created_at DESC, id DESC"
+        # One extra row tells whether another page follows
+        sql = f"SELECT {_JOB_COLUMNS} FROM jobs {where_sql} ORDER BY {order_sql} LIMIT ?"
+        params.append(limit + 1)
+        with con:
+            rows = con.execute(sql, params).fetchall()
+        has_more = len(rows) > limit
+        jobs = [_record_from_row(row) for row in rows[:limit]]
+        if before is not None:
+            jobs.reverse()
+        return HistoryPage(jobs=jobs, has_more=has_more)
+
+    def job_stats(
+        self,
+        window: Optional[StatsWindow] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        status: JobStatus = JobStatus.SUCCESS,
+    ) -> List[JobStats]:
+        """
+        p50/p95 duration and throughput (pages/s) of jobs per strategy, oldest window first.
+
+        With `window`, jobs are also grouped by the hour, day, week or month they were
+        created in, e.g. to compare throughput before and after an upgrade. `since` and
+        `until` bound created_at (inclusive, exclusive). Percentiles are nearest-rank,
+        computed in SQL so only one row per group leaves the database; jobs recorded
+        before telemetry was kept, and runs that wrote no pages (a resume with every
+        output already in place), count towards duration but not throughput.
+        """
+        where = ["status = ?", "duration_ms IS NOT NULL"]
+        params: List[Any] = [status.value]
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since.isoformat())
+        if until is not None:
+            where.append("created_at < ?")
+            params.append(until.isoformat())
+        window_sql = _WINDOW_SQL[window] if window else "NULL"
+        sql = f"""
+            WITH selected AS (
+                SELECT strategy, {window_sql} AS win, duration_ms,
+                    CASE WHEN pages_processed > 0 THEN pages_per_sec END AS pages_per_sec,
+                    pages_processed, input_bytes, output_bytes
+                FROM jobs WHERE {' AND '.join(where)}
+            ),
+            ranked AS (
+                SELECT *,
+                    COUNT(*) OVER grp AS n,
+                    COUNT(pages_per_sec) OVER grp AS n_rate,
+                    ROW_NUMBER() OVER (grp ORDER BY duration_ms) AS rank_duration,
+                    ROW_NUMBER() OVER (grp ORDER BY pages_per_sec IS NULL, pages_per_sec) AS rank_rate
+                FROM selected
+                WINDOW grp AS (PARTITION BY strategy, win)
+            )
+            SELECT strategy, win, n,
+                MIN(CASE WHEN rank_duration * 100 >= 50 * n THEN duration_ms END),
+                MIN(CASE WHEN rank_duration * 100 >= 95 * n THEN duration_ms END),
+                MIN(CASE WHEN pages_per_sec IS NOT NULL AND rank_rate * 100 >= 50 * n_rate THEN pages_per_sec END),
+                MIN(CASE WHEN pages_per_sec IS NOT NULL AND rank_rate * 100 >= 95 * n_rate THEN pages_per_sec END),
+                TOTAL(pages_processed), TOTAL(input_bytes), TOTAL(output_bytes)
+            FROM ranked
+            GROUP BY strategy, win
+            ORDER BY win, strategy
+        """
+        con = self._connect()
+        with con:
+            rows = con.execute(sql, params).fetchall()
+        return [
+            JobStats(
+                strategy=SplitStrategy(strategy),
+                window_start=datetime.fromisoformat(win) if win else None,
+                jobs=int(n),
+                p50_duration_ms=p50_duration,
+                p95_duration_ms=p95_duration,
+                p50_pages_per_sec=p50_rate,
+                p95_pages_per_sec=p95_rate,
+                pages_processed=int(pages),
+                input_bytes=int(input_bytes),
+                output_bytes=int(output_bytes),
             )
-        return result
+            for (strategy, win, n, p50_duration, p95_duration, p50_rate, p95_rate, pages, input_bytes, output_bytes) in rows
+        ]
 
     def get_job(self, job_id: int) -> Optional[HistoryRecord]:
-        con = sqlite3.connect(self.path)
-        try:
+        con = self._connect()
+        with con:
             cur = con.cursor()
             cur.execute(
-                "SELECT id, created_at, input_path, output_dir, strategy, params_json, status, duration_ms, output_count, error_message, output_sample FROM jobs WHERE id = ?",
+                f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?",
                 (job_id,),
             )
             row = cur.fetchone()
-        finally:
-            con.close()
         if not row:
             return None
-        (rid, created_at, input_path, output_dir, strategy, params_json, status, duration_ms, output_count, error_message, output_sample) = row
-        return HistoryRecord(
-            id=int(rid),
-            created_at=datetime.fromisoformat(created_at),
-            input_path=input_path,
-            output_dir=output_dir,
-            strategy=SplitStrategy(strategy),
-            params_json=json.loads(params_json),
-            status=JobStatus(status),
-            duration_ms=duration_ms,
-            output_count=output_count,
-            error_message=error_message,
-            output_sample=json.loads(output_sample) if output_sample else None,
+        return _record_from_row(row)
+
+    def add_job_output(self, rec: JobOutputRecord) -> None:
+        """Checkpoint one finished output; re-recording an index replaces the old row."""
+        con = self._connect()
+        with con:
+            self._insert_job_outputs(con, [rec])
+
+    def _insert_job_outputs(self, con: sqlite3.Connection, recs: List[JobOutputRecord]) -> None:
+        con.executemany(
+            """
+            INSERT OR REPLACE INTO job_outputs (job_id, idx, pages, path, size_bytes, sha256, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(rec.job_id, rec.idx, rec.pages, rec.path, rec.size_bytes, rec.sha256, rec.created_at.isoformat()) for rec in recs],
         )
 
+    def list_job_outputs(self, job_id: int) -> List[JobOutputRecord]:
+        con = self._connect()
+        with con:
+            cur = con.cursor()
+            cur.execute(
+                "SELECT job_id, idx, pages, path, size_bytes, sha256, created_at FROM job_outputs WHERE job_id = ? ORDER BY idx",
+                (job_id,),
+            )
+            rows = cur.fetchall()
+        return [
+            JobOutputRecord(
+                job_id=int(jid),
+                idx=int(idx),
+                pages=pages,
+                path=path,
+                size_bytes=int(size_bytes),
+                sha256=sha256,
+                created_at=datetime.fromisoformat(created_at),
+            )
+            for (jid, idx, pages, path, size_bytes, sha256, created_at) in rows
+        ]
+
+    def delete_job_outputs(self, job_id: int, idxs: Optional[Iterable[int]] = None) -> None:
+        """Drop the given checkpoints of a job, or all of them when idxs is None."""
+        con = self._connect()
+        with con:
+            cur = con.cursor()
+            if idxs is None:
+                cur.execute("DELETE FROM job_outputs WHERE job_id = ?", (job_id,))
+            else:
+                cur.executemany("DELETE FROM job_outputs WHERE job_id = ? AND idx = ?", [(job_id, i) for i in idxs])
+
     def clear(self) -> None:
-        con = sqlite3.connect(self.path)
-        try:
+        con = self._connect()
+        with con:
             cur = con.cursor()
+            cur.execute("DELETE FROM job_outputs;")
             cur.execute("DELETE FROM jobs;")
+
+    def apply_retention(
+        self,
+        policy: RetentionPolicy,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> RetentionStats:
+        """
+        Remove the jobs the policy expires, oldest first, then return the freed space.
+
+        Jobs go in batches of policy.batch_size, each in its own short transaction, so job
+        threads writing history wait at most one batch. With policy.archive, each batch is
+        appended to archive_path and fsynced inside that transaction, before its rows are
+        deleted; the archive's committed size is kept in the database, and an append whose
+        transaction did not commit is cut off the file before the next one. `should_stop`
+        is checked between batches.
+        """
+        started = time.monotonic()
+        stats = RetentionStats()
+        stopped = should_stop or (lambda: False)
+        con = self._connect()
+        expired = self._expired_condition(con, policy)
+        if expired is not None:
+            condition, params = expired
+            while not stopped():
+                removed = self._remove_batch(con, policy, condition, params)
+                if not removed:
+                    break
+                stats.deleted += removed
+                if policy.archive:
+                    stats.archived += removed
+        if stats.deleted and not stopped():
+            stats.freed_pages = self._release_free_pages(con, stopped)
+        stats.duration_ms = int((time.monotonic() - started) * 1000)
+        return stats
+
+    def _expired_condition(self, con: sqlite3.Connection, policy: RetentionPolicy) -> Optional[Tuple[str, List[Any]]]:
+        """SQL condition (and its parameters) matching the jobs the policy removes, or None for none."""
+        if not policy.statuses:
+            return None
+        limits = []
+        params: List[Any] = [s.value for s in policy.statuses]
+        if policy.max_age_days is not None:
+            limits.append("created_at < ?")
+            params.append((now_utc() - timedelta(days=policy.max_age_days)).isoformat())
+        if policy.max_jobs is not None:
+            if policy.max_jobs <= 0:
+                limits.append("1 = 1")
+            else:
+                # The oldest job that still fits; everything older is over the limit
+                row = con.execute(
+                    "SELECT created_at, id FROM jobs ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?",
+                    (policy.max_jobs - 1,),
+                ).fetchone()
+                if row:
+                    limits.append("(created_at, id) < (?, ?)")
+                    params.extend(row)
+        if not limits:
+            return None
+        placeholders = ", ".join("?" for _ in policy.statuses)
+        return f"status IN ({placeholders}) AND ({' OR '.join(limits)})", params
+
+    def _remove_batch(self, con: sqlite3.Connection, policy: RetentionPolicy, condition: str, params: List[Any]) -> int:
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            rows = con.execute(
+                f"SELECT {_JOB_COLUMNS} FROM jobs WHERE {condition} ORDER BY created_at, id LIMIT ?",
+                (*params, policy.batch_size),
+            ).fetchall()
+            if rows:
+                if policy.archive:
+                    self._archive(con, [_record_from_row(row) for row in rows])
+                ids = [(row[0],) for row in rows]
+                con.executemany("DELETE FROM job_outputs WHERE job_id = ?", ids)
+                con.executemany("DELETE FROM jobs WHERE id = ?", ids)
             con.commit()
-        finally:
-            con.close()
+        except BaseException:
+            con.rollback()
+            raise
+        return len(rows)
+
+    def _archive(self, con: sqlite3.Connection, records: List[HistoryRecord]) -> None:
+        """Append records to the archive; must run inside the transaction that deletes them."""
+        row = con.execute("SELECT value FROM meta WHERE key = 'archive_size'").fetchone()
+        try:
+            actual = os.path.getsize(self.archive_path)
+        except OSError:
+            actual = 0
+        committed = int(row[0]) if row else actual
+        if actual > committed:
+            # Left by a batch whose deletion never committed; those jobs are archived again now
+            os.truncate(self.archive_path, committed)
+        append_archive(self.archive_path, records)
+        con.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('archive_size', ?)",
+            (str(os.path.getsize(self.archive_path)),),
+        )
+
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        Switch a database created before retention existed to incremental vacuum.
+
+        Takes one full VACUUM, which compacts the file and holds an exclusive lock until
+        it is done, so call it before any job can write history (the app does so at
+        start). Returns whether a conversion ran; newer databases need none.
+        """
+        con = self._connect()
+        if con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        con.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        con.execute("VACUUM")
+        return True
+
+    def _release_free_pages(self, con: sqlite3.Connection, stopped: Callable[[], bool]) -> int:
+        """Shrink the file by the pages deleted rows left free; returns how many were released."""
+        if con.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Not converted yet (see enable_incremental_vacuum); free pages are reused by
+            # later inserts, but the file only shrinks once it has been
+            return 0
+        before = con.execute("PRAGMA page_count").fetchone()[0]
+        while not stopped() and con.execute("PRAGMA freelist_count").fetchone()[0]:
+            con.execute(f"PRAGMA incremental_vacuum({_VACUUM_STEP_PAGES})").fetchall()
+        # In WAL mode the file itself only shrinks once the log is copied back into it
+        con.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+        return max(before - con.execute("PRAGMA page_count").fetchone()[0], 0)
+
+
+class HistoryWriter:
+    """
+    Write-behind group commit in front of a HistoryStore's job writes.
+
+    Status updates are merged per job and, with output checkpoints, committed by one
+    thread, together, in a single transaction: flush_interval_s after the first of them
+    arrives, or as soon as max_pending updates and checkpoints are waiting. Two
+    exceptions wait for their commit:
+
+    - add_job, because the caller needs the new id (jobs started together still share one);
+    - update_job with a terminal status (success, failed, cancelled), which is committed
+      with synchronous=FULL, along with everything pending, before the call returns. A
+      caller reporting completion afterwards never reports a job the database could lose.
+
+    Reads go to the store directly and may miss updates from the last flush interval.
+    """
+
+    def __init__(self, store: HistoryStore, flush_interval_s: float = 0.05, max_pending: int = 256) -> None:
+        self.store = store
+        self.flush_interval_s = flush_interval_s
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        self._inserts: List[Tuple[HistoryRecord, Future]] = []
+        self._updates: Dict[int, Dict[str, Any]] = {}
+        self._outputs: List[JobOutputRecord] = []
+        self._waiters: List[Future] = []  # resolved by the next commit
+        self._first_pending: Optional[float] = None
+        self._urgent = False  # commit without waiting out the interval
+        self._durable = False  # commit with synchronous=FULL
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="pdfsplitter-history-writer", daemon=True)
+        self._thread.start()
+
+    def add_job(self, rec: HistoryRecord) -> int:
+        future: Future = Future()
+        with self._cond:
+            self._check_open()
+            self._inserts.append((rec, future))
+            self._urgent = True
+            self._cond.notify()
+        return future.result()
+
+    def update_job(self, job_id: int, **fields: Any) -> None:
+        status = fields.get("status")
+        durable = getattr(status, "value", status) in _TERMINAL_STATUSES
+        with self._cond:
+            self._check_open()
+            self._updates.setdefault(job_id, {}).update(fields)
+            self._queued()
+            if not durable:
+                self._cond.notify()
+                return
+            future = self._request_commit(durable=True)
+        future.result()
+
+    def add_job_output(self, rec: JobOutputRecord) -> None:
+        """Queue an output checkpoint; it is committed with the next batch."""
+        with self._cond:
+            self._check_open()
+            self._outputs.append(rec)
+            self._queued()
+            self._cond.notify()
+
+    def flush(self, durable: bool = False) -> None:
+        """Commit everything queued so far before returning."""
+        with self._cond:
+            future = self._request_commit(durable)
+        future.result()
+
+    def close(self) -> None:
+        """Commit what is pending and stop the writer thread; later writes raise RuntimeError."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise RuntimeError("HistoryWriter is closed.")
+
+    def _queued(self) -> None:
+        if self._first_pending is None:
+            self._first_pending = time.monotonic()
+        if len(self._updates) + len(self._outputs) >= self.max_pending:
+            self._urgent = True
+
+    def _request_commit(self, durable: bool) -> Future:
+        future: Future = Future()
+        self._waiters.append(future)
+        self._urgent = True
+        self._durable = self._durable or durable
+        self._cond.notify()
+        return future
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not (self._urgent or self._closed):
+                    if self._first_pending is None:
+                        self._cond.wait()
+                        continue
+                    remaining = self._first_pending + self.flush_interval_s - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                inserts, self._inserts = self._inserts, []
+                updates, self._updates = self._updates, {}
+                outputs, self._outputs = self._outputs, []
+                waiters, self._waiters = self._waiters, []
+                durable, closed = self._durable, self._closed
+                self._first_pending = None
+                self._urgent = self._durable = False
+            if inserts or updates or outputs or waiters:
+                try:
+                    ids = self._commit(inserts, updates, outputs, durable)
+                except BaseException as exc:
+                    for future in [f for _, f in inserts] + waiters:
+                        future.set_exception(exc)
+                else:
+                    for (_, future), job_id in zip(inserts, ids):
+                        future.set_result(job_id)
+                    for future in waiters:
+                        future.set_result(None)
+            if closed:
+                return
+
+    def _commit(
+        self,
+        inserts: List[Tuple[HistoryRecord, Future]],
+        updates: Dict[int, Dict[str, Any]],
+        outputs: List[JobOutputRecord],
+        durable: bool,
+    ) -> List[int]:
+        con = self.store._connect()
+        # Set per batch: it cannot change inside a transaction, and only terminal states need the fsync
+        con.execute(f"PRAGMA synchronous = {'FULL' if durable else 'NORMAL'}")
+        with con:
+            ids = [self.store._insert_job(con, rec) for rec, _ in inserts]
+            for job_id, fields in updates.items():
+                self.store._update_job(con, job_id, fields)
+            if outputs:
+                self.store._insert_job_outputs(con, outputs)
+        return ids
+
+
+class RetentionRunner:
+    """
+    Applies a RetentionPolicy to a store on a daemon thread: shortly after start(), then
+    every interval_s. stop() interrupts a run between batches.
+    """
+
+    def __init__(
+        self,
+        store: HistoryStore,
+        policy: RetentionPolicy,
+        interval_s: float = 6 * 3600,
+        initial_delay_s: float = 60.0,
+    ) -> None:
+        self.store = store
+        self.policy = policy
+        self.interval_s = interval_s
+        self.initial_delay_s = initial_delay_s
+        self.last_stats: Optional[RetentionStats] = None
+        self.last_error: Optional[BaseException] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "RetentionRunner":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="pdfsplitter-retention", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        delay = self.initial_delay_s
+        while not self._stop.wait(delay):
+            try:
+                self.last_stats = self.store.apply_retention(self.policy, should_stop=self._stop.is_set)
+                self.last_error = None
+            except Exception as exc:
+                # A locked or unwritable database now is no reason to stop trying later
+                self.last_error = exc
+            delay = self.interval_s
+
+
+class AsyncHistory:
+    """
+    Runs HistoryStore calls on a background thread and hands the results to callbacks.
+
+    `dispatch` decides where callbacks run: the UI passes a function that schedules them
+    on its main loop, so neither the query nor the disk ever blocks a frame. Calls run
+    one at a time in submission order, so a clear() followed by list_jobs() sees the
+    cleared table. Every method returns the Future of the underlying call.
+    """
+
+    def __init__(
+        self,
+        store: HistoryStore,
+        dispatch: Callable[[Callable[[], None]], None] = lambda fn: fn(),
+    ) -> None:
+        self.store = store
+        self._dispatch = dispatch
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdfsplitter-history")
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        on_result: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        **kwargs: Any,
+    ) -> Future:
+        future = self._executor.submit(fn, *args, **kwargs)
+
+        def done(f: Future) -> None:
+            exc = f.exception()
+            if exc is not None:
+                if on_error:
+                    self._dispatch(lambda: on_error(exc))
+            elif on_result:
+                result = f.result()
+                self._dispatch(lambda: on_result(result))
+
+        future.add_done_callback(done)
+        return future
+
+    def list_jobs(self, on_result: Callable[[List[HistoryRecord]], None], **kwargs: Any) -> Future:
+        return self.submit(self.store.list_jobs, on_result=on_result, **kwargs)
+
+    def list_jobs_page(self, on_result: Callable[[HistoryPage], None], **kwargs: Any) -> Future:
+        return self.submit(self.store.list_jobs_page, on_result=on_result, **kwargs)
+
+    def get_job(self, job_id: int, on_result: Callable[[Optional[HistoryRecord]], None]) -> Future:
+        return self.submit(self.store.get_job, job_id, on_result=on_result)
+
+    def clear(self, on_result: Optional[Callable[[None], None]] = None) -> Future:
+        return self.submit(self.store.clear, on_result=on_result)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
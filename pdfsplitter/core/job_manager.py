@@ -1,38 +1,134 @@
 from __future__ import annotations
 
+import hashlib
+import heapq
+import itertools
+import os
 import threading
-from typing import Callable, Optional
+import time
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
 
-from .history import HistoryStore
-from .models import HistoryRecord, JobStatus, SplitJobParams, SplitJobResult, SplitStrategy, now_utc
+from .history import HistoryStore, HistoryWriter
+from .models import (
+    ExecutionBackend,
+    HistoryRecord,
+    JobOutputRecord,
+    JobStatus,
+    SchedulerStats,
+    SplitJobParams,
+    SplitJobResult,
+    SplitStrategy,
+    now_utc,
+)
+from .process_backend import run_in_process
+from .progress import ProgressReporter
 from .splitter import SplitCancelled, split_pdf
+from .utils import format_page_spec
+
+
+_HASH_CHUNK_BYTES = 1024 * 1024
+# Jobs allowed to run at once unless the caller says otherwise
+DEFAULT_MAX_WORKERS = 2
+
+CompleteCallback = Callable[[Optional[SplitJobResult], Optional[Exception], int], None]
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
 class JobHandle:
-    def __init__(self) -> None:
+    def __init__(self, on_cancel: Optional[Callable[["JobHandle"], None]] = None) -> None:
         self._cancel_flag = threading.Event()
-        self.thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+        self._on_cancel = on_cancel
+        self.thread: Optional[threading.Thread] = None  # worker running the job, once it has started
         self.job_id: Optional[int] = None
+        self.wait_ms: Optional[int] = None  # time spent queued before a worker picked the job up
+        self.run_ms: Optional[int] = None
 
     def cancel(self) -> None:
         self._cancel_flag.set()
+        if self._on_cancel:
+            self._on_cancel(self)
 
     def is_cancelled(self) -> bool:
         return self._cancel_flag.is_set()
 
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until on_complete has returned; False on timeout."""
+        return self._done.wait(timeout)
+
+
+class _QueuedJob:
+    __slots__ = ("handle", "params", "resume", "on_progress", "on_complete", "queued_ns")
+
+    def __init__(
+        self,
+        handle: JobHandle,
+        params: SplitJobParams,
+        resume: bool,
+        on_progress: Optional[Callable[[float, str], None]],
+        on_complete: Optional[CompleteCallback],
+    ) -> None:
+        self.handle = handle
+        self.params = params
+        self.resume = resume
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+        self.queued_ns = time.perf_counter_ns()
+
 
 class JobManager:
-    def __init__(self, history: Optional[HistoryStore] = None) -> None:
+    """
+    Runs split jobs on a bounded pool of worker threads.
+
+    Jobs wait in a priority queue: higher `priority` runs first, and jobs of equal priority
+    run in submission order. At most `max_workers` run at once; worker threads are started
+    as the queue needs them and then stay around for later jobs. A job cancelled while it
+    is still queued is taken out of the queue and completed as cancelled right away.
+
+    With the PROCESS backend a worker thread only supervises: the split itself runs in a
+    worker process (see core.process_backend), which keeps pypdf off this process's GIL
+    and contains crashes, and enforces the jobs' time and memory limits.
+    """
+
+    def __init__(
+        self,
+        history: Optional[HistoryStore] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        backend: ExecutionBackend = ExecutionBackend.THREAD,
+    ) -> None:
         self.history = history or HistoryStore()
+        # Job status writes are group-committed; terminal states are durable before on_complete
+        self._writer = HistoryWriter(self.history)
+        self.max_workers = max(1, int(max_workers))
+        self.backend = backend
+        self._cond = threading.Condition()
+        self._queue: List[Tuple[int, int, _QueuedJob]] = []
+        self._seq = itertools.count()
+        self._workers: List[threading.Thread] = []
+        self._idle = 0
+        self._running: List[JobHandle] = []
+        self._active: Set[int] = set()  # ids of jobs queued or running here
+        self._stats = SchedulerStats(workers=self.max_workers)
 
     def start_job(
         self,
         params: SplitJobParams,
         on_progress: Optional[Callable[[float, str], None]] = None,
-        on_complete: Optional[Callable[[Optional[SplitJobResult], Optional[Exception], int], None]] = None,
+        on_complete: Optional[CompleteCallback] = None,
+        priority: int = 0,
     ) -> JobHandle:
-        handle = JobHandle()
-
+        """Queue a new job; higher priority jobs are picked up first."""
         # Create history record as pending
         rec = HistoryRecord(
             id=None,
@@ -47,37 +143,226 @@ class JobManager:
             error_message=None,
             output_sample=None,
         )
-        job_id = self.history.add_job(rec)
+        job_id = self._writer.add_job(rec)
+        with self._cond:
+            self._active.add(job_id)
+        return self._launch(job_id, params, False, on_progress, on_complete, priority)
+
+    def resume_job(
+        self,
+        job_id: int,
+        on_progress: Optional[Callable[[float, str], None]] = None,
+        on_complete: Optional[CompleteCallback] = None,
+        priority: int = 0,
+    ) -> JobHandle:
+        """
+        Queue an interrupted job again under the same id, writing only the outputs it is missing.
+
+        Only a FAILED or CANCELLED job, or a SUCCESS one whose outputs are no longer all on
+        disk, can be resumed; anything else raises ValueError. Checkpointed outputs are kept
+        when their file still has the recorded size and SHA-256; the others are forgotten
+        and written again. Verification reads every kept file, so it runs on the worker
+        thread rather than the caller's.
+        """
+        rec = self.history.get_job(job_id)
+        if rec is None:
+            raise ValueError(f"No job with id {job_id}.")
+        if rec.status == JobStatus.SUCCESS:
+            outputs = self.history.list_job_outputs(job_id)
+            if len(outputs) >= (rec.output_count or 0) and all(os.path.exists(out.path) for out in outputs):
+                raise ValueError(f"Job {job_id} already completed and its outputs are all present.")
+        elif rec.status not in (JobStatus.FAILED, JobStatus.CANCELLED):
+            raise ValueError(f"Job {job_id} is {rec.status.value} and cannot be resumed.")
+        params = SplitJobParams.from_json_dict(rec.params_json)
+        with self._cond:
+            # The stored status lags behind a resume queued a moment ago
+            if job_id in self._active:
+                raise ValueError(f"Job {job_id} is already queued or running.")
+            self._active.add(job_id)
+        self._writer.update_job(job_id, status=JobStatus.PENDING.value, error_message=None)
+        return self._launch(job_id, params, True, on_progress, on_complete, priority)
+
+    def verified_outputs(self, job_id: int) -> Dict[int, Tuple[str, str]]:
+        """
+        Output index -> (page spec, path) of the job's checkpoints whose files are intact.
+
+        Other checkpoints are dropped. A file that changed after it was checkpointed is left
+        in place, since it is no longer the job's own; the rewrite gets a suffixed name.
+        """
+        verified: Dict[int, Tuple[str, str]] = {}
+        stale = []
+        for out in self.history.list_job_outputs(job_id):
+            try:
+                intact = os.path.getsize(out.path) == out.size_bytes and _file_sha256(out.path) == out.sha256
+            except OSError:
+                intact = False
+            if intact:
+                verified[out.idx] = (out.pages, out.path)
+            else:
+                stale.append(out.idx)
+        if stale:
+            self.history.delete_job_outputs(job_id, stale)
+        return verified
+
+    def stats(self) -> SchedulerStats:
+        """Snapshot of queue depth, wait and run times, for tuning max_workers and priorities."""
+        with self._cond:
+            return replace(self._stats, queued=len(self._queue))
+
+    def shutdown(self) -> None:
+        """Cancel every queued and running job, e.g. when the app exits."""
+        with self._cond:
+            handles = [job.handle for _, _, job in self._queue] + list(self._running)
+        for handle in handles:
+            handle.cancel()
+        # Statuses still waiting in the write-behind queue reach the database now
+        self._writer.flush()
+
+    def _launch(
+        self,
+        job_id: int,
+        params: SplitJobParams,
+        resume: bool,
+        on_progress: Optional[Callable[[float, str], None]],
+        on_complete: Optional[CompleteCallback],
+        priority: int,
+    ) -> JobHandle:
+        handle = JobHandle(on_cancel=self._cancel_queued)
         handle.job_id = job_id
+        job = _QueuedJob(handle, params, resume, on_progress, on_complete)
+        with self._cond:
+            heapq.heappush(self._queue, (-priority, next(self._seq), job))
+            self._stats.max_queue_depth = max(self._stats.max_queue_depth, len(self._queue))
+            # Idle workers each take one queued job; start another only if that leaves some waiting
+            if len(self._queue) > self._idle and len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._worker, name=f"pdfsplitter-job-{len(self._workers) + 1}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            self._cond.notify()
+        return handle
 
-        def run() -> None:
-            # mark running
-            self.history.update_job(job_id, status=JobStatus.RUNNING.value)
+    def _cancel_queued(self, handle: JobHandle) -> None:
+        with self._cond:
+            for i, (_, _, job) in enumerate(self._queue):
+                if job.handle is handle:
+                    break
+            else:
+                # Already running: split_pdf polls the cancel flag
+                return
+            self._queue.pop(i)
+            heapq.heapify(self._queue)
+            self._active.discard(handle.job_id)
+            self._stats.cancelled_while_queued += 1
+        exc = SplitCancelled("Cancelled before start")
+        assert handle.job_id is not None
+        self._writer.update_job(handle.job_id, status=JobStatus.CANCELLED.value, error_message=str(exc))
+        try:
+            if job.on_complete:
+                job.on_complete(None, exc, handle.job_id)
+        finally:
+            handle._done.set()
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._idle += 1
+                    self._cond.wait()
+                    self._idle -= 1
+                _, _, job = heapq.heappop(self._queue)
+                wait_ms = (time.perf_counter_ns() - job.queued_ns) // 1_000_000
+                self._stats.started += 1
+                self._stats.running += 1
+                self._stats.total_wait_ms += wait_ms
+                self._stats.max_wait_ms = max(self._stats.max_wait_ms, wait_ms)
+                self._running.append(job.handle)
+            job.handle.thread = threading.current_thread()
+            job.handle.wait_ms = wait_ms
+            start_ns = time.perf_counter_ns()
             try:
-                result = split_pdf(
-                    params,
-                    progress_callback=lambda p, m: on_progress(p, m) if on_progress else None,
-                    should_cancel=handle.is_cancelled,
-                )
-                self.history.update_job(
-                    job_id,
-                    status=JobStatus.SUCCESS.value,
-                    duration_ms=result.duration_ms,
-                    output_count=len(result.output_files),
-                    output_sample=result.output_files[:5],
+                self._execute(job)
+            finally:
+                run_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+                job.handle.run_ms = run_ms
+                with self._cond:
+                    self._running.remove(job.handle)
+                    self._active.discard(job.handle.job_id)
+                    self._stats.running -= 1
+                    self._stats.finished += 1
+                    self._stats.total_run_ms += run_ms
+                job.handle._done.set()
+
+    def _execute(self, job: _QueuedJob) -> None:
+        handle, params, on_complete = job.handle, job.params, job.on_complete
+        job_id = handle.job_id
+        assert job_id is not None
+        # One reporter per run, so on_progress sees at most progress_rate_hz updates a second
+        progress = ProgressReporter.for_callback(job.on_progress, params.progress_rate_hz) if job.on_progress else None
+
+        def checkpoint(idx: int, pages: Sequence[int], path: str, sha256: str) -> None:
+            # Committed with the job's next status write rather than on its own
+            self._writer.add_job_output(
+                JobOutputRecord(
+                    job_id=job_id,
+                    idx=idx,
+                    pages=format_page_spec(pages),
+                    path=path,
+                    size_bytes=os.path.getsize(path),
+                    sha256=sha256,
+                    created_at=now_utc(),
                 )
-                if on_complete:
-                    on_complete(result, None, job_id)
-            except SplitCancelled as exc:
-                self.history.update_job(job_id, status=JobStatus.CANCELLED.value, error_message=str(exc))
-                if on_complete:
-                    on_complete(None, exc, job_id)
-            except Exception as exc:
-                self.history.update_job(job_id, status=JobStatus.FAILED.value, error_message=str(exc))
-                if on_complete:
-                    on_complete(None, exc, job_id)
-
-        t = threading.Thread(target=run, daemon=True)
-        handle.thread = t
-        t.start()
-        return handle
+            )
+
+        # mark running
+        self._writer.update_job(job_id, status=JobStatus.RUNNING.value)
+        try:
+            completed = self.verified_outputs(job_id) if job.resume else {}
+            previous = self.history.get_job(job_id) if job.resume else None
+            run = run_in_process if self.backend == ExecutionBackend.PROCESS else split_pdf
+            result = run(
+                params,
+                progress_callback=progress,
+                should_cancel=handle.is_cancelled,
+                on_output_written=checkpoint,
+                completed_outputs=completed,
+            )
+            # Outputs the resumed plan could not reuse have been written again under new names
+            kept = set(result.output_files)
+            for _, path in completed.values():
+                if path not in kept:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            telemetry: Dict[str, Any] = dict(
+                duration_ms=result.duration_ms,
+                input_bytes=result.input_bytes,
+                output_bytes=result.output_bytes,
+                pages_processed=result.pages_processed,
+                pages_per_sec=result.pages_per_sec,
+                peak_rss_bytes=result.peak_rss_bytes,
+                open_ms=result.open_ms,
+                plan_ms=result.plan_ms,
+                write_ms=result.write_ms,
+            )
+            if previous is not None and previous.pages_processed is not None:
+                # The job already completed once; a resume only redoes part of it, so keep
+                # the numbers of the run that did the whole split
+                telemetry = {}
+            self._writer.update_job(
+                job_id,
+                status=JobStatus.SUCCESS.value,
+                output_count=len(result.output_files),
+                output_sample=result.output_files[:5],
+                **telemetry,
+            )
+            if on_complete:
+                on_complete(result, None, job_id)
+        except SplitCancelled as exc:
+            self._writer.update_job(job_id, status=JobStatus.CANCELLED.value, error_message=str(exc))
+            if on_complete:
+                on_complete(None, exc, job_id)
+        except Exception as exc:
+            self._writer.update_job(job_id, status=JobStatus.FAILED.value, error_message=str(exc))
+            if on_complete:
+                on_complete(None, exc, job_id)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import gc
+import os
+import sys
+from typing import Any, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+
+# Start evicting once RSS crosses this fraction of the configured ceiling
+_HIGH_WATER_FRACTION = 0.8
+# Above the high-water mark, evict again once the reader has resolved this many objects
+# since the last eviction, or after this many outputs, whichever comes first
+_EVICT_MIN_OBJECTS = 1000
+_EVICT_EVERY_OUTPUTS = 100
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where it cannot be read cheaply."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def max_rss_bytes() -> Optional[int]:
+    """Lifetime peak resident set size of this process."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return int(peak) if sys.platform == "darwin" else int(peak) * 1024
+
+
+def evict_reader_cache(reader: Any) -> int:
+    """Drop every object a PdfReader has resolved so far; they are re-read on demand."""
+    evicted = len(reader.resolved_objects)
+    reader.resolved_objects = {}
+    return evicted
+
+
+class MemoryGuard:
+    """
+    Keeps a job's working set under a memory ceiling and tracks its peak RSS.
+
+    check() is called between outputs; when RSS nears the ceiling the reader's object
+    cache is evicted. RSS rarely drops after Python frees objects, so once above the
+    high-water mark the cache is only evicted again after it has regrown or after a
+    number of outputs, not on every check. With no ceiling it only tracks the peak
+    reported by peak_rss_bytes().
+    """
+
+    def __init__(self, limit_bytes: Optional[int] = None) -> None:
+        self.limit_bytes = limit_bytes
+        self.evictions = 0
+        self._outputs_since_eviction = 0
+        self._start_max_rss = max_rss_bytes()
+        self._sampled_peak = current_rss_bytes() or 0
+
+    def check(self, reader: Any) -> None:
+        if not self.limit_bytes:
+            return
+        rss = current_rss_bytes()
+        if rss is None:
+            return
+        self._sampled_peak = max(self._sampled_peak, rss)
+        self._outputs_since_eviction += 1
+        if rss < self.limit_bytes * _HIGH_WATER_FRACTION:
+            return
+        if self.evictions and len(reader.resolved_objects) < _EVICT_MIN_OBJECTS and self._outputs_since_eviction < _EVICT_EVERY_OUTPUTS:
+            return
+        evict_reader_cache(reader)
+        gc.collect()
+        self.evictions += 1
+        self._outputs_since_eviction = 0
+
+    def peak_rss_bytes(self) -> Optional[int]:
+        """Peak RSS seen during the job; exact when the job raised the process high-water mark."""
+        end_max_rss = max_rss_bytes()
+        if end_max_rss is not None and self._start_max_rss is not None and end_max_rss > self._start_max_rss:
+            return max(end_max_rss, self._sampled_peak)
+        return self._sampled_peak or end_max_rss
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field, fields
 from enum import Enum
 from typing import Any, Dict, List, Optional
 from datetime import datetime
@@ -20,6 +20,26 @@ class SplitStrategy(str, Enum):
     EVERY_N_PAGES = "every_n_pages"  # Split into chunks of N pages
     ODD_TOGETHER = "odd_together"  # Collect all odd pages into one PDF
     EVEN_TOGETHER = "even_together"  # Collect all even pages into one PDF
+    BY_OUTLINE = "by_outline"  # One PDF per outline (bookmark) entry
+    MAX_BYTES = "max_bytes"  # Consecutive pages packed into PDFs under a size budget
+
+
+class OutputProfile(str, Enum):
+    FAST = "fast"  # pypdf's default serialization, nothing extra
+    BALANCED = "balanced"  # object streams, dedup, deflate uncompressed streams
+    SMALLEST = "smallest"  # as balanced, plus max-level recompression of Flate streams
+
+
+class StatsWindow(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"  # starting Monday
+    MONTH = "month"
+
+
+class ExecutionBackend(str, Enum):
+    THREAD = "thread"  # split_pdf runs on a JobManager worker thread in this process
+    PROCESS = "process"  # each job runs in a fresh worker process, see core.process_backend
 
 
 @dataclass
@@ -27,23 +47,118 @@ class SplitJobParams:
     input_path: str
     output_dir: str
     strategy: SplitStrategy
-    ranges_text: Optional[str] = None  # e.g., "1-3, 5, 10-"
+    ranges_text: Optional[str] = None  # e.g., "1-3, 5, 10-", "1-100:2", "10-1"
     pages_per_file: Optional[int] = None  # for EVERY_N_PAGES
+    outline_depth: int = 1  # for BY_OUTLINE: 1 splits at top-level bookmarks, 2 also at their children, ...
+    max_output_bytes: Optional[int] = None  # for MAX_BYTES: size budget per output file
     output_prefix: str = "split"
     zero_pad_digits: int = 3
     preserve_metadata: bool = True
+    workers: Optional[int] = None  # >1 writes RANGES/EACH_PAGE/EVERY_N_PAGES outputs in a process pool
+    prune_resources: bool = False  # keep only the fonts/XObjects/etc. each page's content references
+    memory_limit_mb: Optional[int] = None  # streaming mode: read from disk and evict cached objects near this RSS
+    mmap_input: bool = False  # memory-map the input instead of reading it into a private buffer
+    use_document_cache: bool = True  # reuse a parsed input from core.doc_cache across jobs
+    passthrough: bool = False  # copy unmodified objects as raw input bytes; falls back to PdfWriter
+    profile: Optional[OutputProfile] = None  # output size/speed trade-off, see core.optimize
+    fsync_outputs: bool = False  # fsync every written file (and the directory) once at job end
+    io_queue_depth: Optional[int] = None  # >0 overlaps serialization with disk writes through a queue this deep
+    keep_range_order: bool = False  # RANGES: one output per item, in the order written, without merging
+    progress_rate_hz: Optional[float] = 10.0  # most progress updates delivered per second; None or 0 for every one
+    time_limit_s: Optional[float] = None  # process backend: stop the job after this many seconds
+    address_space_limit_mb: Optional[int] = None  # process backend: hard RLIMIT_AS of the worker process
 
     def to_json_dict(self) -> Dict[str, Any]:
         data = asdict(self)
         data["strategy"] = self.strategy.value
+        data["profile"] = self.profile.value if self.profile else None
         return data
 
+    @classmethod
+    def from_json_dict(cls, data: Dict[str, Any]) -> "SplitJobParams":
+        """Inverse of to_json_dict; keys this version does not know are ignored."""
+        known = {f.name for f in fields(cls)}
+        values = {key: value for key, value in data.items() if key in known}
+        values["strategy"] = SplitStrategy(values["strategy"])
+        values["profile"] = OutputProfile(values["profile"]) if values.get("profile") else None
+        return cls(**values)
+
+
+@dataclass
+class ProgressUpdate:
+    fraction: float  # 0..1
+    message: str  # includes throughput and ETA once they are known
+    pages_done: int = 0  # pages written so far in this run
+    bytes_done: int = 0  # bytes written so far in this run
+    pages_per_sec: Optional[float] = None
+    bytes_per_sec: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    final: bool = False  # last update of the job; never dropped by rate limiting
+
+
+@dataclass
+class PipelineStats:
+    outputs: int = 0
+    wall_ms: int = 0  # from pipeline start until the last write finished
+    serialize_ms: int = 0  # producer building and serializing outputs
+    producer_blocked_ms: int = 0  # producer waiting on a full queue
+    io_ms: int = 0  # I/O stage writing and renaming files
+    io_idle_ms: int = 0  # I/O stage waiting on an empty queue
+    max_queue_depth: int = 0
+
+    @property
+    def serialize_utilization(self) -> float:
+        return self.serialize_ms / self.wall_ms if self.wall_ms else 0.0
+
+    @property
+    def io_utilization(self) -> float:
+        return self.io_ms / self.wall_ms if self.wall_ms else 0.0
+
+
+@dataclass
+class SchedulerStats:
+    workers: int = 0  # jobs allowed to run at once
+    queued: int = 0  # jobs waiting for a worker right now
+    running: int = 0
+    max_queue_depth: int = 0
+    started: int = 0  # jobs that got a worker
+    finished: int = 0
+    cancelled_while_queued: int = 0
+    total_wait_ms: int = 0  # queued until picked up, summed over started jobs
+    max_wait_ms: int = 0
+    total_run_ms: int = 0  # picked up until complete, summed over finished jobs
+
+    @property
+    def mean_wait_ms(self) -> float:
+        return self.total_wait_ms / self.started if self.started else 0.0
+
+    @property
+    def mean_run_ms(self) -> float:
+        return self.total_run_ms / self.finished if self.finished else 0.0
+
 
 @dataclass
 class SplitJobResult:
     output_files: List[str]
     total_pages: int
     duration_ms: int
+    resource_bytes_saved: int = 0  # estimated bytes left out by prune_resources
+    peak_rss_bytes: Optional[int] = None  # highest resident set size seen by the job (or its workers)
+    cache_evictions: int = 0  # reader object cache evictions under memory_limit_mb (summed across workers)
+    output_bytes: int = 0  # total size of the written files
+    write_ms: int = 0  # time spent serializing and writing outputs (summed across workers)
+    pipeline: Optional[PipelineStats] = None  # stage statistics when io_queue_depth is set
+    size_estimate_error: Optional[float] = None  # MAX_BYTES: mean |actual - estimated| / max(actual, estimated)
+    correction_passes: int = 0  # MAX_BYTES: outputs re-packed because they came out over budget
+    oversize_outputs: int = 0  # MAX_BYTES: single-page outputs that alone exceed the budget
+    input_bytes: int = 0  # size of the input file
+    pages_processed: int = 0  # pages written by this run; reused outputs of a resumed job not included
+    open_ms: int = 0  # validating and opening the input, up to the page count
+    plan_ms: int = 0  # compiling the split plan
+
+    @property
+    def pages_per_sec(self) -> Optional[float]:
+        return self.pages_processed * 1000 / self.duration_ms if self.duration_ms > 0 else None
 
 
 @dataclass
@@ -59,6 +174,94 @@ class HistoryRecord:
     output_count: Optional[int]
     error_message: Optional[str]
     output_sample: Optional[List[str]]
+    # Telemetry of the last successful run; None for jobs recorded before it was kept
+    input_bytes: Optional[int] = None
+    output_bytes: Optional[int] = None
+    pages_processed: Optional[int] = None
+    pages_per_sec: Optional[float] = None
+    peak_rss_bytes: Optional[int] = None
+    open_ms: Optional[int] = None
+    plan_ms: Optional[int] = None
+    write_ms: Optional[int] = None
+
+
+# HistoryRecord's performance fields; each is also a column of the history jobs table
+TELEMETRY_FIELDS = (
+    "input_bytes",
+    "output_bytes",
+    "pages_processed",
+    "pages_per_sec",
+    "peak_rss_bytes",
+    "open_ms",
+    "plan_ms",
+    "write_ms",
+)
+
+
+@dataclass(frozen=True)
+class HistoryCursor:
+    """Position of a job in history order (newest first); see HistoryStore.list_jobs_page."""
+
+    created_at: datetime
+    id: int
+
+    @classmethod
+    def of(cls, rec: HistoryRecord) -> "HistoryCursor":
+        return cls(created_at=rec.created_at, id=int(rec.id))
+
+
+@dataclass
+class HistoryPage:
+    jobs: List[HistoryRecord]  # newest first
+    has_more: bool  # further jobs exist past this page, in the direction it was read
+
+
+@dataclass
+class RetentionPolicy:
+    """Which jobs HistoryStore.apply_retention removes; a job matching any limit goes."""
+
+    max_age_days: Optional[float] = None  # remove jobs created longer ago than this
+    max_jobs: Optional[int] = None  # keep only this many of the newest jobs
+    statuses: List[JobStatus] = field(
+        default_factory=lambda: [JobStatus.SUCCESS, JobStatus.FAILED, JobStatus.CANCELLED]
+    )  # only jobs in these states are ever removed; pending and running jobs stay
+    archive: bool = True  # append removed jobs to the compressed archive first
+    batch_size: int = 500  # jobs removed per transaction, so writers are never held up for long
+
+
+@dataclass
+class RetentionStats:
+    archived: int = 0
+    deleted: int = 0
+    freed_pages: int = 0  # database pages returned to the file system by incremental vacuum
+    duration_ms: int = 0
+
+
+@dataclass
+class JobStats:
+    """Aggregates of successful jobs of one strategy (in one time window); see HistoryStore.job_stats."""
+
+    strategy: SplitStrategy
+    window_start: Optional[datetime]  # None when not grouped by time
+    jobs: int
+    p50_duration_ms: Optional[int]
+    p95_duration_ms: Optional[int]
+    p50_pages_per_sec: Optional[float]  # None when no job in the group has telemetry
+    p95_pages_per_sec: Optional[float]
+    pages_processed: int = 0
+    input_bytes: int = 0
+    output_bytes: int = 0
+
+
+@dataclass
+class JobOutputRecord:
+    job_id: int
+    idx: int  # position of the output in the job's plan
+    pages: str  # 1-based page spec of the output, e.g. "5", "1-3", "20-1:5"
+    path: str
+    size_bytes: int
+    sha256: str
+    created_at: datetime
 
 
 def now_utc() -> datetime:
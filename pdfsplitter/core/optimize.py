@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import hashlib
+import zlib
+from dataclasses import dataclass
+from io import BytesIO
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+from pypdf import PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    EncodedStreamObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    PdfObject,
+    StreamObject,
+)
+
+from .models import OutputProfile
+
+
+@dataclass(frozen=True)
+class ProfileSettings:
+    object_streams: bool  # pack non-stream objects into object streams with an xref stream
+    dedup: bool  # merge byte-identical objects
+    compress_level: Optional[int]  # zlib level for uncompressed streams; None leaves them alone
+    recompress: bool  # also re-deflate plain FlateDecode streams at compress_level
+    objects_per_stream: int = 100
+
+
+PROFILE_SETTINGS: Dict[OutputProfile, ProfileSettings] = {
+    OutputProfile.FAST: ProfileSettings(object_streams=False, dedup=False, compress_level=None, recompress=False),
+    OutputProfile.BALANCED: ProfileSettings(object_streams=True, dedup=True, compress_level=6, recompress=False),
+    OutputProfile.SMALLEST: ProfileSettings(
+        object_streams=True, dedup=True, compress_level=9, recompress=True, objects_per_stream=200
+    ),
+}
+
+# Dedup merges children first, which can make their parents identical; a few passes catch that
+_DEDUP_PASSES = 3
+# Object types that must stay distinct even when their bytes match
+_STRUCTURAL_TYPES = ("/Page", "/Pages", "/Catalog")
+
+
+def write_xref_table(out: IO[bytes], offsets: Dict[int, Tuple[int, int]]) -> int:
+    """
+    Write a classic xref table for {object number: (offset, generation)} and return its offset.
+
+    One subsection is written per run of consecutive object numbers, so sparse numbering
+    does not cost an entry per unused number.
+    """
+    xref_location = out.tell()
+    out.write(b"xref\n0 1\n0000000000 65535 f \n")
+    for first, run in _runs(sorted(offsets)):
+        out.write(f"{first} {len(run)}\n".encode())
+        for num in run:
+            offset, gen = offsets[num]
+            out.write(f"{offset:010d} {gen:05d} n \n".encode())
+    return xref_location
+
+
+def write_optimized(writer: PdfWriter, out: IO[bytes], profile: OutputProfile) -> None:
+    """Serialize a populated PdfWriter to out using the given output profile."""
+    settings = PROFILE_SETTINGS[profile]
+    if not (settings.object_streams or settings.dedup or settings.compress_level is not None):
+        writer.write(out)
+        return
+
+    # Same preparation PdfWriter.write_stream does before serializing
+    if not writer._root:
+        writer._root = writer._add_object(writer._root_object)
+    writer._sweep_indirect_references(writer._root)
+
+    objects: Dict[int, PdfObject] = {i + 1: obj for i, obj in enumerate(writer._objects) if obj is not None}
+    root_num = writer._root.idnum
+    info_num = writer._info_obj.indirect_reference.idnum if writer._info_obj.indirect_reference else None
+
+    if settings.compress_level is not None:
+        for num, obj in list(objects.items()):
+            if isinstance(obj, StreamObject):
+                objects[num] = _compress_stream(obj, settings.compress_level, settings.recompress)
+    if settings.dedup:
+        _dedup(objects, writer, protected={root_num, info_num})
+
+    header = writer.pdf_header
+    if settings.object_streams:
+        header = max(header, "%PDF-1.5")
+        _write_with_object_streams(out, header, objects, writer, root_num, info_num, settings)
+    else:
+        _write_classic(out, header, objects, writer, root_num, info_num)
+
+
+def _runs(numbers: List[int]) -> List[Tuple[int, List[int]]]:
+    runs: List[Tuple[int, List[int]]] = []
+    for num in numbers:
+        if runs and runs[-1][1][-1] == num - 1:
+            runs[-1][1].append(num)
+        else:
+            runs.append((num, [num]))
+    return runs
+
+
+def _compress_stream(obj: StreamObject, level: int, recompress: bool) -> StreamObject:
+    """Deflate an unfiltered stream, or re-deflate a plain Flate one, keeping whichever is smaller."""
+    filters = obj.get("/Filter")
+    try:
+        if filters is None:
+            raw = obj.get_data()
+        elif recompress and filters == "/FlateDecode" and "/DecodeParms" not in obj:
+            raw = zlib.decompress(obj._data)
+        else:
+            return obj
+        data = zlib.compress(raw, level)
+    except Exception:
+        return obj
+    if len(data) >= len(obj._data):
+        return obj
+    compressed = EncodedStreamObject()
+    for key, value in obj.items():
+        if key != "/Length":
+            compressed[NameObject(key)] = value
+    compressed[NameObject("/Filter")] = NameObject("/FlateDecode")
+    compressed._data = data
+    return compressed
+
+
+def _serialize(obj: PdfObject) -> bytes:
+    buf = BytesIO()
+    obj.write_to_stream(buf)
+    return buf.getvalue()
+
+
+def _dedup(objects: Dict[int, PdfObject], writer: PdfWriter, protected: set) -> None:
+    for _ in range(_DEDUP_PASSES):
+        canonical: Dict[bytes, int] = {}
+        remap: Dict[int, int] = {}
+        for num in sorted(objects):
+            obj = objects[num]
+            if num in protected:
+                continue
+            if isinstance(obj, DictionaryObject) and obj.get("/Type") in _STRUCTURAL_TYPES:
+                continue
+            digest = hashlib.sha256(_serialize(obj)).digest()
+            first = canonical.setdefault(digest, num)
+            if first != num:
+                remap[num] = first
+        if not remap:
+            return
+        for num in remap:
+            del objects[num]
+        for obj in objects.values():
+            _remap_refs(obj, remap, writer)
+
+
+def _remap_refs(obj: Any, remap: Dict[int, int], writer: PdfWriter) -> None:
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, DictionaryObject):
+            entries = list(item.items())
+        elif isinstance(item, ArrayObject):
+            entries = list(enumerate(item))
+        else:
+            continue
+        for key, value in entries:
+            if isinstance(value, IndirectObject):
+                if value.idnum in remap:
+                    item[key] = IndirectObject(remap[value.idnum], 0, writer)
+            elif isinstance(value, (DictionaryObject, ArrayObject)):
+                stack.append(value)
+
+
+def _trailer_entries(writer: PdfWriter, root_num: int, info_num: Optional[int]) -> Dict[NameObject, PdfObject]:
+    entries: Dict[NameObject, PdfObject] = {NameObject("/Root"): IndirectObject(root_num, 0, writer)}
+    if info_num is not None:
+        entries[NameObject("/Info")] = IndirectObject(info_num, 0, writer)
+    if writer._ID:
+        entries[NameObject("/ID")] = writer._ID
+    return entries
+
+
+def _write_object(out: IO[bytes], num: int, obj: PdfObject) -> None:
+    out.write(f"{num} 0 obj\n".encode())
+    obj.write_to_stream(out)
+    out.write(b"\nendobj\n")
+
+
+def _write_classic(
+    out: IO[bytes],
+    header: str,
+    objects: Dict[int, PdfObject],
+    writer: PdfWriter,
+    root_num: int,
+    info_num: Optional[int],
+) -> None:
+    out.write(header.encode() + b"\n%\xE2\xE3\xCF\xD3\n")
+    offsets: Dict[int, Tuple[int, int]] = {}
+    for num in sorted(objects):
+        offsets[num] = (out.tell(), 0)
+        _write_object(out, num, objects[num])
+    xref_location = write_xref_table(out, offsets)
+    trailer = DictionaryObject({NameObject("/Size"): NumberObject(max(objects) + 1)})
+    trailer.update(_trailer_entries(writer, root_num, info_num))
+    out.write(b"trailer\n")
+    trailer.write_to_stream(out)
+    out.write(f"\nstartxref\n{xref_location}\n%%EOF\n".encode())
+
+
+def _write_with_object_streams(
+    out: IO[bytes],
+    header: str,
+    objects: Dict[int, PdfObject],
+    writer: PdfWriter,
+    root_num: int,
+    info_num: Optional[int],
+    settings: ProfileSettings,
+) -> None:
+    level = settings.compress_level if settings.compress_level is not None else 6
+    out.write(header.encode() + b"\n%\xE2\xE3\xCF\xD3\n")
+    # Cross-reference entries: (type, field 2, field 3) per PDF 1.5 xref streams
+    entries: Dict[int, Tuple[int, int, int]] = {}
+    packable: List[int] = []
+    for num in sorted(objects):
+        obj = objects[num]
+        if isinstance(obj, StreamObject):
+            # Streams cannot live inside object streams
+            entries[num] = (1, out.tell(), 0)
+            _write_object(out, num, obj)
+        else:
+            packable.append(num)
+
+    next_num = max(objects) + 1
+    per_stream = settings.objects_per_stream
+    for start in range(0, len(packable), per_stream):
+        chunk = packable[start:start + per_stream]
+        stream_num = next_num
+        next_num += 1
+        offsets: List[str] = []
+        body = BytesIO()
+        for index, num in enumerate(chunk):
+            offsets.append(f"{num} {body.tell()}")
+            objects[num].write_to_stream(body)
+            body.write(b"\n")
+            entries[num] = (2, stream_num, index)
+        head = " ".join(offsets).encode() + b"\n"
+        object_stream = EncodedStreamObject()
+        object_stream.update({
+            NameObject("/Type"): NameObject("/ObjStm"),
+            NameObject("/N"): NumberObject(len(chunk)),
+            NameObject("/First"): NumberObject(len(head)),
+            NameObject("/Filter"): NameObject("/FlateDecode"),
+        })
+        object_stream._data = zlib.compress(head + body.getvalue(), level)
+        entries[stream_num] = (1, out.tell(), 0)
+        _write_object(out, stream_num, object_stream)
+
+    xref_num = next_num
+    xref_location = out.tell()
+    entries[xref_num] = (1, xref_location, 0)
+    entries[0] = (0, 0, 65535)
+
+    width2 = max(1, (max(e[1] for e in entries.values()).bit_length() + 7) // 8)
+    width3 = max(1, (max(e[2] for e in entries.values()).bit_length() + 7) // 8)
+    index = ArrayObject()
+    rows = BytesIO()
+    for first, run in _runs(sorted(entries)):
+        index.extend([NumberObject(first), NumberObject(len(run))])
+        for num in run:
+            kind, field2, field3 = entries[num]
+            rows.write(bytes([kind]) + field2.to_bytes(width2, "big") + field3.to_bytes(width3, "big"))
+
+    xref_stream = EncodedStreamObject()
+    xref_stream.update({
+        NameObject("/Type"): NameObject("/XRef"),
+        NameObject("/Size"): NumberObject(xref_num + 1),
+        NameObject("/W"): ArrayObject([NumberObject(1), NumberObject(width2), NumberObject(width3)]),
+        NameObject("/Index"): index,
+        NameObject("/Filter"): NameObject("/FlateDecode"),
+    })
+    xref_stream.update(_trailer_entries(writer, root_num, info_num))
+    xref_stream._data = zlib.compress(rows.getvalue(), level)
+    _write_object(out, xref_num, xref_stream)
+    out.write(f"startxref\n{xref_location}\n%%EOF\n".encode())
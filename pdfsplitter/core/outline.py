@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, Destination, IndirectObject, NullObject
+
+
+# Label for the pages before the first bookmark
+FRONT_MATTER_TITLE = "front_matter"
+
+
+def page_index_map(reader: PdfReader) -> Dict[Tuple[int, int], int]:
+    """Map every page's (idnum, generation) to its 0-based index, in one pass over the page tree."""
+    index: Dict[Tuple[int, int], int] = {}
+    for i, page in enumerate(reader.pages):
+        ref = page.indirect_reference
+        if ref is not None:
+            index.setdefault((ref.idnum, ref.generation), i)
+    return index
+
+
+def _resolve_page(target: Any, index: Dict[Tuple[int, int], int], num_pages: int) -> Optional[int]:
+    """0-based page index a destination's page entry points at, or None if it cannot be resolved."""
+    if isinstance(target, IndirectObject):
+        return index.get((target.idnum, target.generation))
+    if isinstance(target, int):
+        # Remote-style destinations give the page number directly
+        return int(target) if 0 <= int(target) < num_pages else None
+    if isinstance(target, ArrayObject) and target:
+        return _resolve_page(target[0], index, num_pages)
+    return None
+
+
+def outline_entries(reader: PdfReader, depth: int = 1) -> List[Tuple[str, int]]:
+    """
+    (title, 0-based start page) for every outline entry down to `depth` levels, in outline order.
+
+    Destinations are resolved through a page-reference index built once, instead of a
+    page-tree search per bookmark. Entries whose destination cannot be resolved are skipped.
+    """
+    index = page_index_map(reader)
+    num_pages = len(reader.pages)
+    entries: List[Tuple[str, int]] = []
+
+    def walk(items: List[Any], level: int) -> None:
+        # A nested list holds the children of the item just before it
+        for item in items:
+            if isinstance(item, list):
+                if level < depth:
+                    walk(item, level + 1)
+            elif isinstance(item, Destination) and not isinstance(item.page, NullObject):
+                page = _resolve_page(item.page, index, num_pages)
+                if page is not None:
+                    entries.append((str(item.title or ""), page))
+
+    walk(reader.outline, 1)
+    return entries
+
+
+def outline_sections(reader: PdfReader, depth: int = 1) -> List[Tuple[str, range]]:
+    """
+    Split the document into (title, page range) sections starting at each outline entry.
+
+    Sections run to the page before the next entry; pages before the first entry form a
+    front-matter section. When several entries start on the same page, the first one in
+    outline order names the section.
+    """
+    num_pages = len(reader.pages)
+    starts: Dict[int, str] = {}
+    for title, page in outline_entries(reader, depth):
+        starts.setdefault(page, title)
+    if not starts:
+        return []
+    if 0 not in starts:
+        starts[0] = FRONT_MATTER_TITLE
+    ordered = sorted(starts)
+    sections = []
+    for start, end in zip(ordered, ordered[1:] + [num_pages]):
+        sections.append((starts[start], range(start, end)))
+    return sections
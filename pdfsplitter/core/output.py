@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple
+
+
+# Temporary names are hidden and carry a suffix file watchers commonly ignore
+_TEMP_SUFFIX = ".part"
+
+
+def _temp_path(final_path: str) -> str:
+    directory, name = os.path.split(final_path)
+    return os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}{_TEMP_SUFFIX}")
+
+
+def _commit_new(temp_path: str, final_path: str) -> None:
+    """Move temp_path to final_path; raises FileExistsError rather than replace a file there."""
+    try:
+        os.link(temp_path, final_path)
+    except FileExistsError:
+        raise
+    except OSError:
+        # No hard links on this filesystem (FAT, some network shares): claim the name
+        # exclusively, then replace the empty placeholder
+        os.close(os.open(final_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+        os.replace(temp_path, final_path)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@contextmanager
+def atomic_write(final_path: str) -> Iterator[IO[bytes]]:
+    """
+    Open a temporary file next to final_path and move it into place once the block exits cleanly.
+
+    On an exception the temporary file is removed, so readers of the directory only ever
+    see complete outputs under their final names. An existing file is never replaced:
+    when final_path exists by then, FileExistsError is raised.
+    """
+    temp_path = _temp_path(final_path)
+    try:
+        with open(temp_path, "wb") as f:
+            yield f
+        _commit_new(temp_path, final_path)
+    finally:
+        _remove_quietly(temp_path)
+
+
+def write_buffer(final_path: str, buffer: BytesIO, out_dir: Optional[OutputDirectory] = None) -> Tuple[str, str]:
+    """
+    Write a serialized output like atomic_write; returns the path written and the SHA-256 of its bytes.
+
+    When final_path was created by someone else after out_dir listed the directory (another
+    job writing there), the output takes the next free name out_dir hands out instead.
+    Without out_dir, FileExistsError is raised.
+    """
+    data = buffer.getbuffer()
+    temp_path = _temp_path(final_path)
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        while True:
+            try:
+                _commit_new(temp_path, final_path)
+                break
+            except FileExistsError:
+                if out_dir is None:
+                    raise
+                final_path = out_dir.reserve_next(final_path)
+    finally:
+        _remove_quietly(temp_path)
+    return final_path, hashlib.sha256(data).hexdigest()
+
+
+def fsync_paths(paths: List[str]) -> None:
+    """Flush the given files and their directories to stable storage."""
+    directories = set()
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        directories.add(os.path.dirname(os.path.abspath(path)))
+    for directory in directories:
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            # Directories cannot be opened for fsync on some platforms (Windows)
+            continue
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+class OutputDirectory:
+    """
+    Output file names for one directory, resolved against a single listing.
+
+    The directory is listed once; collisions are then resolved against the in-memory
+    index (plus the names handed out so far) instead of stat-ing every candidate.
+    Files created in the directory by others after the listing (such as a concurrent
+    job) are only found when an output is committed: write_buffer then asks
+    reserve_next() for another name.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._names: Set[str] = {os.path.normcase(name) for name in os.listdir(path)}
+        # Next suffix to try per base name, so repeated re-runs do not rescan -1, -2, ...
+        self._next_suffix: Dict[str, int] = {}
+        # Base name each handed-out name was reserved for, to continue its suffixes
+        self._bases: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, base_name: str) -> str:
+        """Return a free path for base_name, adding a -N suffix on collision, and claim it."""
+        root, ext = os.path.splitext(base_name)
+        with self._lock:
+            name = base_name
+            suffix = self._next_suffix.get(base_name, 1)
+            while os.path.normcase(name) in self._names:
+                name = f"{root}-{suffix}{ext}"
+                suffix += 1
+            self._next_suffix[base_name] = suffix
+            self._names.add(os.path.normcase(name))
+            self._bases[os.path.normcase(name)] = base_name
+        return os.path.join(self.path, name)
+
+    def claim(self, path: str, base_name: str) -> None:
+        """Record a name reserved by another OutputDirectory (a worker's parent) for base_name."""
+        key = os.path.normcase(os.path.basename(path))
+        with self._lock:
+            self._names.add(key)
+            self._bases[key] = base_name
+
+    def reserve_next(self, path: str) -> str:
+        """Another free path for the output reserved as path, whose name turned out to be taken on disk."""
+        key = os.path.normcase(os.path.basename(path))
+        with self._lock:
+            self._names.add(key)
+            base_name = self._bases.get(key, os.path.basename(path))
+        return self.reserve(base_name)
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import re
+import weakref
+from typing import IO, Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from pypdf import PageObject, PdfReader
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NullObject,
+    NumberObject,
+    StreamObject,
+    create_string_object,
+)
+
+from .optimize import write_xref_table
+
+
+class PassthroughUnsupported(Exception):
+    """The input or output cannot be written by raw object copying."""
+
+
+ObjectKey = Tuple[int, int]  # (idnum, generation)
+
+_OBJ_HEADER = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj\b")
+_STREAM_KEYWORD = re.compile(rb"stream\r?\n")
+# Initial read window when looking for the end of a non-stream object
+_READ_WINDOW = 4096
+
+_offset_maps: "weakref.WeakKeyDictionary[PdfReader, Dict[ObjectKey, int]]" = weakref.WeakKeyDictionary()
+
+
+def object_offsets(reader: PdfReader) -> Dict[ObjectKey, int]:
+    """(num, gen) -> file offset of every object stored directly in the file, built once per reader."""
+    offsets = _offset_maps.get(reader)
+    if offsets is None:
+        offsets = {}
+        for gen, table in reader.xref.items():
+            for num, offset in table.items():
+                if num not in reader.xref_objStm:
+                    offsets[(num, gen)] = offset
+        _offset_maps[reader] = offsets
+    return offsets
+
+
+def write_passthrough(
+    reader: PdfReader,
+    pages: Sequence[PageObject],
+    out: IO[bytes],
+    preserve_metadata: bool = True,
+) -> None:
+    """
+    Write the given pages to out, copying unmodified objects as raw byte slices of the input.
+
+    Objects keep their input object numbers, so references inside copied bytes stay valid
+    and nothing has to be parsed back into Python objects and re-serialized. Only the page
+    dictionaries, objects that point at pages outside this output, the page tree, catalog,
+    info dictionary, xref table and trailer are generated.
+
+    Raises PassthroughUnsupported when the input cannot be handled this way (encryption,
+    objects not where the xref says they are); callers fall back to PdfWriter.
+    """
+    if reader.is_encrypted:
+        raise PassthroughUnsupported("encrypted input")
+
+    page_keys: List[ObjectKey] = []
+    for page in pages:
+        ref = page.indirect_reference
+        if ref is None:
+            raise PassthroughUnsupported("page without an object number")
+        page_keys.append((ref.idnum, ref.generation))
+    if len(set(page_keys)) != len(page_keys):
+        raise PassthroughUnsupported("page repeated within one output")
+    own_pages = set(page_keys)
+
+    copier = _ObjectCopier(reader, own_pages, object_offsets(reader))
+    for page in pages:
+        copier.visit_value(page)
+
+    next_num = max(int(reader.trailer.get("/Size", 0)), max(k[0] for k in copier.closure | own_pages) + 1)
+    pages_root_num = next_num
+    catalog_num = next_num + 1
+    info_num = next_num + 2 if preserve_metadata and reader.metadata is not None else None
+
+    offsets: Dict[int, Tuple[int, int]] = {}
+
+    def begin(num: int, gen: int) -> None:
+        offsets[num] = (out.tell(), gen)
+        out.write(f"{num} {gen} obj\n".encode())
+
+    version = reader.pdf_header if reader.pdf_header.startswith("%PDF-") else "%PDF-1.7"
+    out.write(version.encode() + b"\n%\xE2\xE3\xCF\xD3\n")
+
+    pages_root_ref = IndirectObject(pages_root_num, 0, reader)
+    for page, (num, gen) in zip(pages, page_keys):
+        page_dict = copier.rewrite(page, drop_keys=("/Parent", "/StructParents"))
+        page_dict[NameObject("/Parent")] = pages_root_ref
+        begin(num, gen)
+        page_dict.write_to_stream(out)
+        out.write(b"\nendobj\n")
+
+    for key in sorted(copier.closure - own_pages):
+        num, gen = key
+        obj = copier.resolved[key]
+        if key in copier.dirty or key not in copier.offsets:
+            # Rewritten, or stored inside an object stream: serialize this one object
+            begin(num, gen)
+            copier.rewrite(obj).write_to_stream(out)
+            out.write(b"\nendobj\n")
+        else:
+            raw = copier.raw_bytes(key, obj)
+            offsets[num] = (out.tell(), gen)
+            out.write(raw)
+            out.write(b"\n")
+
+    begin(pages_root_num, 0)
+    DictionaryObject({
+        NameObject("/Type"): NameObject("/Pages"),
+        NameObject("/Kids"): ArrayObject(IndirectObject(n, g, reader) for n, g in page_keys),
+        NameObject("/Count"): NumberObject(len(page_keys)),
+    }).write_to_stream(out)
+    out.write(b"\nendobj\n")
+
+    begin(catalog_num, 0)
+    DictionaryObject({
+        NameObject("/Type"): NameObject("/Catalog"),
+        NameObject("/Pages"): pages_root_ref,
+    }).write_to_stream(out)
+    out.write(b"\nendobj\n")
+
+    if info_num is not None:
+        info = DictionaryObject()
+        for key, value in list(reader.metadata.items()):  # type: ignore[union-attr]
+            if isinstance(value, IndirectObject):
+                value = value.get_object()
+            info[NameObject(key)] = create_string_object(str(value))
+        begin(info_num, 0)
+        info.write_to_stream(out)
+        out.write(b"\nendobj\n")
+
+    xref_location = write_xref_table(out, offsets)
+    trailer = DictionaryObject({
+        NameObject("/Size"): NumberObject(max(offsets) + 1),
+        NameObject("/Root"): IndirectObject(catalog_num, 0, reader),
+    })
+    if info_num is not None:
+        trailer[NameObject("/Info")] = IndirectObject(info_num, 0, reader)
+    out.write(b"trailer\n")
+    trailer.write_to_stream(out)
+    out.write(f"\nstartxref\n{xref_location}\n%%EOF\n".encode())
+
+
+class _ObjectCopier:
+    """Computes the object closure of an output's pages and extracts raw object bytes."""
+
+    def __init__(self, reader: PdfReader, own_pages: Set[ObjectKey], offsets: Dict[ObjectKey, int]) -> None:
+        self.reader = reader
+        self.own_pages = own_pages
+        self.closure: Set[ObjectKey] = set()
+        self.resolved: Dict[ObjectKey, Any] = {}
+        # Objects that reference pages (or page tree nodes) outside this output
+        self.dirty: Set[ObjectKey] = set()
+        # Shared by every output of the reader; read only
+        self.offsets = offsets
+
+    def _is_foreign(self, ref: IndirectObject) -> bool:
+        """True when ref points at a page or page tree node that is not part of this output."""
+        key = (ref.idnum, ref.generation)
+        if key in self.own_pages:
+            return False
+        obj = self._resolve(key)
+        return isinstance(obj, DictionaryObject) and obj.get("/Type") in ("/Page", "/Pages")
+
+    def _resolve(self, key: ObjectKey) -> Any:
+        obj = self.resolved.get(key)
+        if obj is None:
+            obj = self.reader.get_object(IndirectObject(key[0], key[1], self.reader))
+            self.resolved[key] = obj
+        return obj
+
+    def visit_value(self, root: Any) -> None:
+        """Add every object reachable from root (a page or direct value) to the closure."""
+        pending: List[Tuple[Optional[ObjectKey], Any]] = [(None, root)]
+        while pending:
+            owner, value = pending.pop()
+            if isinstance(value, IndirectObject):
+                key = (value.idnum, value.generation)
+                if self._is_foreign(value):
+                    if owner is not None:
+                        self.dirty.add(owner)
+                    continue
+                if key in self.closure or key in self.own_pages:
+                    continue
+                self.closure.add(key)
+                pending.append((key, self._resolve(key)))
+            elif isinstance(value, DictionaryObject):
+                for k, v in value.items():
+                    if owner is None and k == "/Parent":
+                        continue
+                    pending.append((owner, v))
+            elif isinstance(value, ArrayObject):
+                pending.extend((owner, v) for v in value)
+
+    def rewrite(self, value: Any, drop_keys: Sequence[str] = ()) -> Any:
+        """Copy of a direct value with references to foreign pages replaced by null."""
+        if isinstance(value, IndirectObject):
+            return NullObject() if self._is_foreign(value) else value
+        if isinstance(value, StreamObject):
+            copy = value.__class__()
+            copy._data = value._data
+            for k, v in value.items():
+                copy[NameObject(k)] = self.rewrite(v)
+            return copy
+        if isinstance(value, DictionaryObject):
+            copy_dict = DictionaryObject()
+            for k, v in value.items():
+                if k not in drop_keys:
+                    copy_dict[NameObject(k)] = self.rewrite(v)
+            return copy_dict
+        if isinstance(value, ArrayObject):
+            return ArrayObject(self.rewrite(v) for v in value)
+        return value
+
+    def raw_bytes(self, key: ObjectKey, obj: Any) -> bytes:
+        """The input bytes of an uncompressed object, from 'n g obj' through 'endobj'."""
+        offset = self.offsets[key]
+        stream_len = len(obj._data) if isinstance(obj, StreamObject) else 0
+        stream = self.reader.stream
+        saved = stream.tell()
+        try:
+            window = _READ_WINDOW + stream_len
+            while True:
+                stream.seek(offset)
+                data = stream.read(window)
+                header = _OBJ_HEADER.match(data)
+                if header is None or (int(header.group(1)), int(header.group(2))) != key:
+                    raise PassthroughUnsupported(f"object {key[0]} {key[1]} not found at its xref offset")
+                search_from = header.end()
+                if stream_len:
+                    keyword = _STREAM_KEYWORD.search(data, search_from)
+                    if keyword is not None:
+                        search_from = keyword.end() + stream_len
+                end = data.find(b"endobj", search_from)
+                if end >= 0:
+                    return data[header.start(1):end + len(b"endobj")]
+                if len(data) < window:
+                    raise PassthroughUnsupported(f"object {key[0]} {key[1]} has no endobj")
+                window *= 2
+        finally:
+            stream.seek(saved)
+
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from io import BytesIO
+from typing import Callable, Optional, Tuple
+
+from .models import PipelineStats
+from .output import OutputDirectory, write_buffer
+
+
+class WritePipeline:
+    """
+    Bounded producer/consumer hand-off between output serialization and disk I/O.
+
+    The producer serializes each output into an in-memory buffer and submits it; a
+    single I/O thread drains the queue and commits every buffer to its final path with
+    write_buffer. At most `depth` serialized outputs wait in memory, so a slow disk
+    throttles the producer instead of letting buffers pile up. on_written is called on
+    the I/O thread with each output's submitted path, the path actually written (another
+    name from out_dir when the submitted one was taken meanwhile) and its SHA-256, once
+    the file is in place.
+    """
+
+    def __init__(
+        self,
+        depth: int,
+        on_written: Optional[Callable[[str, str, str], None]] = None,
+        out_dir: Optional[OutputDirectory] = None,
+    ) -> None:
+        self._queue: "queue.Queue[Optional[Tuple[str, BytesIO]]]" = queue.Queue(maxsize=max(1, depth))
+        self._on_written = on_written
+        self._out_dir = out_dir
+        self._error: Optional[BaseException] = None
+        self._aborted = threading.Event()
+        self._written = 0
+        self._io_ns = 0
+        self._idle_ns = 0
+        self._blocked_ns = 0
+        self._max_depth = 0
+        self._start_ns = time.perf_counter_ns()
+        self._thread = threading.Thread(target=self._run, name="pdfsplitter-io", daemon=True)
+        self._thread.start()
+
+    def submit(self, out_path: str, buffer: BytesIO) -> None:
+        """Queue a serialized output, blocking while the queue is full; re-raises I/O stage errors."""
+        self._raise_if_failed()
+        t0 = time.perf_counter_ns()
+        while True:
+            try:
+                self._queue.put((out_path, buffer), timeout=0.1)
+                break
+            except queue.Full:
+                self._raise_if_failed()
+        self._blocked_ns += time.perf_counter_ns() - t0
+        self._max_depth = max(self._max_depth, self._queue.qsize())
+
+    def close(self) -> PipelineStats:
+        """Wait for every queued output to be written and return the stage statistics."""
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_if_failed()
+        return self._stats()
+
+    def abort(self) -> None:
+        """Drop outputs that have not been written yet and stop the I/O thread."""
+        self._aborted.set()
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._queue.put(None)
+        self._thread.join()
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        while True:
+            t0 = time.perf_counter_ns()
+            item = self._queue.get()
+            t1 = time.perf_counter_ns()
+            self._idle_ns += t1 - t0
+            if item is None or self._aborted.is_set() or self._error is not None:
+                # Keep draining after a failure so a blocked producer can notice it
+                if item is None:
+                    return
+                continue
+            out_path, buffer = item
+            try:
+                final_path, sha256 = write_buffer(out_path, buffer, self._out_dir)
+                self._written += 1
+                if self._on_written:
+                    self._on_written(out_path, final_path, sha256)
+            except BaseException as exc:
+                self._error = exc
+            finally:
+                self._io_ns += time.perf_counter_ns() - t1
+
+    def _stats(self) -> PipelineStats:
+        return PipelineStats(
+            outputs=self._written,
+            wall_ms=(time.perf_counter_ns() - self._start_ns) // 1_000_000,
+            io_ms=self._io_ns // 1_000_000,
+            io_idle_ms=self._idle_ns // 1_000_000,
+            producer_blocked_ms=self._blocked_ns // 1_000_000,
+            max_queue_depth=self._max_depth,
+        )
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from pypdf import PdfReader
+
+from .models import SplitJobParams, SplitStrategy
+from .outline import outline_sections
+from .sizing import estimator_for
+from .utils import parse_page_spec
+
+
+# Outline titles can be whole sentences; keep file names manageable
+_MAX_TITLE_CHARS = 60
+
+
+class PagePlan:
+    """
+    The outputs of a split job, compiled to flat arrays.
+
+    pages holds the 0-based page indices of every output back to back; output k covers
+    pages[bounds[k]:bounds[k + 1]]. Every output is an arithmetic progression and
+    steps[k] is its stride (negative for reverse order), so output_pages() can hand out
+    a range instead of copying indices. Plans may be shared through the compile cache
+    and must be treated as read-only.
+    """
+
+    __slots__ = ("pages", "bounds", "steps", "labels", "numbered")
+
+    def __init__(
+        self,
+        pages: array,
+        bounds: array,
+        steps: array,
+        labels: Optional[List[str]] = None,
+        numbered: bool = True,
+    ) -> None:
+        self.pages = pages
+        self.bounds = bounds
+        self.steps = steps
+        # Explicit file name labels; derived from the page numbers when None
+        self.labels = labels
+        # Whether file names carry a running output number
+        self.numbered = numbered
+
+    def __len__(self) -> int:
+        return len(self.bounds) - 1
+
+    @property
+    def page_count(self) -> int:
+        """Total pages written across all outputs."""
+        return len(self.pages)
+
+    def output_pages(self, k: int) -> range:
+        """0-based page indices of output k, in output order."""
+        lo, hi = self.bounds[k], self.bounds[k + 1]
+        step = self.steps[k]
+        first = self.pages[lo]
+        return range(first, first + step * (hi - lo), step)
+
+    def min_page(self, k: int) -> int:
+        lo, hi = self.bounds[k], self.bounds[k + 1]
+        return min(self.pages[lo], self.pages[hi - 1])
+
+    def label(self, k: int) -> str:
+        if self.labels is not None:
+            return self.labels[k]
+        return range_label(self.output_pages(k))
+
+
+def range_label(pages: range) -> str:
+    """File name label for an output holding the given 0-based pages."""
+    first, last = pages[0] + 1, pages[-1] + 1
+    if len(pages) == 1:
+        return f"p{first}"
+    if abs(pages.step) == 1:
+        return f"{first}-{last}"
+    return f"{first}-{last}_step{abs(pages.step)}"
+
+
+class PlanBuilder:
+    """Accumulates outputs into a PagePlan."""
+
+    def __init__(self) -> None:
+        self._pages = array("i")
+        self._bounds = array("i", [0])
+        self._steps = array("i")
+        self._labels: Dict[int, str] = {}
+
+    def add_range(self, pages: range, label: Optional[str] = None) -> None:
+        if not pages:
+            return
+        if label is not None:
+            self._labels[len(self._steps)] = label
+        self._pages.extend(pages)
+        self._bounds.append(len(self._pages))
+        self._steps.append(pages.step)
+
+    def add_chunks(self, num_pages: int, size: int) -> None:
+        """Outputs of `size` consecutive pages covering the whole document, built without a Python loop."""
+        base = len(self._pages)
+        count = -(-num_pages // size)
+        self._pages.extend(range(num_pages))
+        self._bounds.extend(range(base + size, base + num_pages, size))
+        self._bounds.append(base + num_pages)
+        self._steps.extend(array("i", [1]) * count)
+
+    def build(self, numbered: bool = True) -> PagePlan:
+        plan = PagePlan(self._pages, self._bounds, self._steps, None, numbered)
+        if self._labels:
+            # Unlabelled outputs keep the label derived from their pages
+            plan.labels = [self._labels.get(k) or plan.label(k) for k in range(len(plan))]
+        return plan
+
+
+def compile_plan(params: SplitJobParams, num_pages: int, reader: Optional[PdfReader] = None) -> PagePlan:
+    """
+    Compile a job's strategy into a PagePlan; identical requests share one cached plan.
+
+    BY_OUTLINE and MAX_BYTES need the opened reader and are compiled afresh each time.
+    """
+    if params.strategy == SplitStrategy.BY_OUTLINE:
+        if reader is None:
+            raise ValueError("Outline strategy needs the input document.")
+        return _compile_outline(reader, params.outline_depth)
+    if params.strategy == SplitStrategy.MAX_BYTES:
+        if not params.max_output_bytes or params.max_output_bytes < 1:
+            raise ValueError("Max bytes strategy requires 'max_output_bytes' >= 1.")
+        if reader is None:
+            raise ValueError("Max bytes strategy needs the input document.")
+        builder = PlanBuilder()
+        for pages, _ in estimator_for(reader).pack(range(num_pages), params.max_output_bytes):
+            builder.add_range(pages)
+        return builder.build()
+    return _compile_cached(
+        params.strategy,
+        params.ranges_text,
+        params.pages_per_file,
+        params.keep_range_order,
+        num_pages,
+    )
+
+
+@lru_cache(maxsize=32)
+def _compile_cached(
+    strategy: SplitStrategy,
+    ranges_text: Optional[str],
+    pages_per_file: Optional[int],
+    keep_range_order: bool,
+    num_pages: int,
+) -> PagePlan:
+    builder = PlanBuilder()
+    if strategy == SplitStrategy.RANGES:
+        if not ranges_text:
+            raise ValueError("Ranges strategy requires 'ranges_text'.")
+        for r in parse_page_spec(ranges_text, num_pages, keep_order=keep_range_order):
+            builder.add_range(r.indices())
+    elif strategy == SplitStrategy.EACH_PAGE:
+        builder.add_chunks(num_pages, 1)
+    elif strategy == SplitStrategy.EVERY_N_PAGES:
+        if not pages_per_file or pages_per_file < 1:
+            raise ValueError("Every N pages strategy requires 'pages_per_file' >= 1.")
+        builder.add_chunks(num_pages, pages_per_file)
+    elif strategy in (SplitStrategy.ODD_TOGETHER, SplitStrategy.EVEN_TOGETHER):
+        # Special case: all odd (or even) pages grouped into a single output
+        first = 0 if strategy == SplitStrategy.ODD_TOGETHER else 1
+        kind = "odd" if strategy == SplitStrategy.ODD_TOGETHER else "even"
+        builder.add_range(range(first, num_pages, 2), label=f"{kind}_pages")
+        return builder.build(numbered=False)
+    else:
+        raise ValueError(f"Unknown split strategy: {strategy}")
+    return builder.build()
+
+
+def _compile_outline(reader: PdfReader, depth: int) -> PagePlan:
+    if depth < 1:
+        raise ValueError("Outline strategy requires 'outline_depth' >= 1.")
+    sections = outline_sections(reader, depth)
+    if not sections:
+        raise ValueError("PDF has no outline entries to split by.")
+    builder = PlanBuilder()
+    for title, pages in sections:
+        builder.add_range(pages, label=title.strip()[:_MAX_TITLE_CHARS] or "section")
+    return builder.build()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import multiprocessing
+import signal
+import threading
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from .models import SplitJobParams, SplitJobResult
+from .splitter import SplitCancelled, split_pdf
+
+
+# How often the parent checks the cancel flag and the time limit while waiting on the worker
+_POLL_SECONDS = 0.1
+# How long a worker gets to notice the cancel flag before it is terminated
+_CANCEL_GRACE_SECONDS = 5.0
+# How long a terminated worker gets to exit before it is killed
+_TERMINATE_GRACE_SECONDS = 2.0
+
+# Spawned workers start from a clean interpreter: no UI state, no threads inherited mid-lock
+_context = multiprocessing.get_context("spawn")
+
+
+class JobTimedOut(Exception):
+    pass
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+def run_in_process(
+    params: SplitJobParams,
+    progress_callback: Optional[Callable[[float, str], None]] = None,
+    should_cancel: Optional[Callable[[], bool]] = None,
+    on_output_written: Optional[Callable[[int, Sequence[int], str, str], None]] = None,
+    completed_outputs: Optional[Dict[int, Tuple[str, str]]] = None,
+) -> SplitJobResult:
+    """
+    Run split_pdf in a fresh worker process, with the same callbacks and result.
+
+    Progress and written outputs stream back over a pipe and are passed to the callbacks
+    on this thread. Cancellation sets an event shared with the worker, which split_pdf
+    polls as usual; a worker that ignores it for _CANCEL_GRACE_SECONDS is terminated.
+    params.time_limit_s terminates the worker and raises JobTimedOut, and
+    params.address_space_limit_mb caps the worker's address space, so a runaway
+    allocation fails the job with MemoryError instead of exhausting the machine. A
+    worker that dies without reporting back (killed, segfault) raises WorkerCrashed.
+    """
+    receiver, sender = _context.Pipe(duplex=False)
+    cancel_event = _context.Event()
+    process = _context.Process(
+        target=_worker_main,
+        args=(sender, params, completed_outputs or {}, cancel_event),
+        name="pdfsplitter-job",
+    )
+    process.start()
+    # Only the worker writes to the pipe; without our copy closed, recv() would never see EOF
+    sender.close()
+    start = time.monotonic()
+    cancel_sent: Optional[float] = None
+    try:
+        while True:
+            now = time.monotonic()
+            if cancel_sent is None and should_cancel and should_cancel():
+                cancel_event.set()
+                cancel_sent = now
+            if cancel_sent is not None and now - cancel_sent > _CANCEL_GRACE_SECONDS:
+                raise SplitCancelled()
+            if params.time_limit_s and now - start > params.time_limit_s:
+                cancel_event.set()
+                raise JobTimedOut(f"Job exceeded its time limit of {params.time_limit_s:g} s")
+            if not receiver.poll(_POLL_SECONDS):
+                continue
+            try:
+                message = receiver.recv()
+            except EOFError:
+                process.join()
+                raise WorkerCrashed(_exit_description(process.exitcode))
+            kind = message[0]
+            if kind == "progress":
+                if progress_callback:
+                    progress_callback(message[1], message[2])
+            elif kind == "output":
+                if on_output_written:
+                    on_output_written(message[1], message[2], message[3], message[4])
+            elif kind == "result":
+                return message[1]
+            elif kind == "error":
+                raise message[1]
+    finally:
+        receiver.close()
+        _stop(process)
+
+
+def _worker_main(
+    conn: Connection,
+    params: SplitJobParams,
+    completed_outputs: Dict[int, Tuple[str, str]],
+    cancel_event: Any,
+) -> None:
+    """Worker-process entry point: run one split and report everything over conn."""
+    # Cancellation comes from the parent; a terminal's Ctrl+C reaches the whole process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if params.address_space_limit_mb:
+        _limit_address_space(params.address_space_limit_mb * 1024 * 1024)
+    # The I/O pipeline thread reports outputs too, and a Connection is not thread-safe
+    lock = threading.Lock()
+
+    def send(message: Tuple[Any, ...]) -> None:
+        with lock:
+            conn.send(message)
+
+    try:
+        result = split_pdf(
+            params,
+            progress_callback=lambda p, m: send(("progress", p, m)),
+            should_cancel=cancel_event.is_set,
+            on_output_written=lambda k, pages, path, sha256: send(("output", k, pages, path, sha256)),
+            completed_outputs=completed_outputs,
+        )
+        send(("result", result))
+    except BaseException as exc:
+        try:
+            try:
+                send(("error", exc))
+            except OSError:
+                raise
+            except Exception:
+                # Exceptions that cannot be pickled are reported by message
+                send(("error", RuntimeError(f"{type(exc).__name__}: {exc}")))
+        except OSError:
+            # The parent stopped listening (time limit, cancel grace expired); nobody to tell
+            pass
+    finally:
+        conn.close()
+
+
+def _limit_address_space(limit_bytes: int) -> None:
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows; the time limit still applies
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit_bytes = min(limit_bytes, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, hard))
+
+
+def _stop(process: Any) -> None:
+    """Wait briefly for the worker to exit, then terminate and finally kill it."""
+    process.join(_TERMINATE_GRACE_SECONDS if process.exitcode is None else None)
+    if process.is_alive():
+        process.terminate()
+        process.join(_TERMINATE_GRACE_SECONDS)
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+
+def _exit_description(exitcode: Optional[int]) -> str:
+    if exitcode is not None and exitcode < 0:
+        return f"Worker process was killed by signal {-exitcode}"
+    return f"Worker process exited with code {exitcode} before reporting a result"
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Optional
+
+from .models import ProgressUpdate
+from .utils import humanize_bytes, humanize_ms
+
+
+class ProgressReporter:
+    """
+    Coalesces progress updates to at most `max_rate_hz` deliveries per second.
+
+    Callable as a plain (fraction, message) progress callback, so it can be passed
+    anywhere one is expected. Updates arriving faster than the rate replace each other
+    and only the latest is delivered, at the next update past the interval or at
+    flush(). An update at fraction 1.0 is final and always delivered right away, as is
+    whatever is pending when flush() is called. Writers report finished pages and bytes
+    through advance(); every delivered update carries the resulting throughput and ETA.
+    Safe to call from several threads (the split thread and the I/O pipeline thread).
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[ProgressUpdate], None],
+        max_rate_hz: Optional[float] = 10.0,
+    ) -> None:
+        self._sink = sink
+        self._interval = 1.0 / max_rate_hz if max_rate_hz else 0.0
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._last_emit: Optional[float] = None
+        self._pending: Optional[ProgressUpdate] = None
+        self._finished = False
+        self.total_pages: Optional[int] = None  # pages this run will write, for the ETA
+        self.pages_done = 0
+        self.bytes_done = 0
+
+    @classmethod
+    def for_callback(
+        cls, callback: Callable[[float, str], None], max_rate_hz: Optional[float] = 10.0
+    ) -> "ProgressReporter":
+        """Reporter delivering to a (fraction, message) callback."""
+        return cls(lambda update: callback(update.fraction, update.message), max_rate_hz)
+
+    def __call__(self, fraction: float, message: str) -> None:
+        self.update(fraction, message)
+
+    def advance(self, pages: int, nbytes: int) -> None:
+        """Count pages and bytes that have been written; delivered with the next update."""
+        with self._lock:
+            self.pages_done += pages
+            self.bytes_done += nbytes
+
+    def update(self, fraction: float, message: str) -> None:
+        with self._lock:
+            if self._finished:
+                return
+            now = time.monotonic()
+            final = fraction >= 1.0
+            self._pending = self._snapshot(fraction, message, now, final)
+            if final or self._last_emit is None or now - self._last_emit >= self._interval:
+                self._emit(now)
+
+    def flush(self) -> None:
+        """Deliver the latest coalesced update, if it has not been delivered yet."""
+        with self._lock:
+            if self._pending is not None and not self._finished:
+                self._emit(time.monotonic())
+
+    def _emit(self, now: float) -> None:
+        update = self._pending
+        assert update is not None
+        self._pending = None
+        self._last_emit = now
+        if update.final:
+            self._finished = True
+        self._sink(update)
+
+    def _snapshot(self, fraction: float, message: str, now: float, final: bool) -> ProgressUpdate:
+        elapsed = now - self._start
+        update = ProgressUpdate(
+            fraction=fraction,
+            message=message,
+            pages_done=self.pages_done,
+            bytes_done=self.bytes_done,
+            final=final,
+        )
+        if final or not self.pages_done or elapsed <= 0:
+            return update
+        update.pages_per_sec = self.pages_done / elapsed
+        update.bytes_per_sec = self.bytes_done / elapsed
+        if self.total_pages:
+            update.eta_seconds = max(0, self.total_pages - self.pages_done) / update.pages_per_sec
+        elif fraction > 0:
+            update.eta_seconds = elapsed * (1 - fraction) / fraction
+        details = f"{update.pages_per_sec:.0f} pages/s, {humanize_bytes(update.bytes_per_sec)}/s"
+        if update.eta_seconds is not None:
+            details += f", ETA {humanize_ms(int(update.eta_seconds * 1000))}"
+        update.message = f"{message} ({details})"
+        return update
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from pypdf import PageObject
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject
+
+
+# Resource categories that are looked up by name from content stream operators
+_PRUNABLE_CATEGORIES = ("/XObject", "/Font", "/ExtGState", "/Shading", "/ColorSpace", "/Pattern", "/Properties")
+
+# Operators whose first operand names a resource in a fixed category
+_FIRST_OPERAND_CATEGORY = {
+    b"Do": "/XObject",
+    b"Tf": "/Font",
+    b"gs": "/ExtGState",
+    b"sh": "/Shading",
+    b"cs": "/ColorSpace",
+    b"CS": "/ColorSpace",
+}
+
+# Approximate per-object overhead of "n 0 obj ... endobj" plus its xref entry
+_OBJECT_OVERHEAD_BYTES = 40
+
+ObjectKey = Tuple[int, int]
+
+
+def referenced_resource_names(page: PageObject) -> Optional[Dict[str, Set[str]]]:
+    """
+    Scan a page's content streams and collect the resource names it uses, per category.
+
+    Returns None when the content cannot be parsed, in which case callers must keep
+    the page's resources untouched.
+    """
+    used: Dict[str, Set[str]] = {category: set() for category in _PRUNABLE_CATEGORIES}
+    try:
+        content = page.get_contents()
+        if content is None:
+            return used
+        for operands, operator in content.operations:
+            if operator == b"INLINE IMAGE":
+                settings = operands.get("settings", {})
+                colorspace = settings.get("/CS", settings.get("/ColorSpace"))
+                if isinstance(colorspace, NameObject):
+                    used["/ColorSpace"].add(str(colorspace))
+                continue
+            category = _FIRST_OPERAND_CATEGORY.get(operator)
+            if category is not None:
+                if operands and isinstance(operands[0], NameObject):
+                    used[category].add(str(operands[0]))
+            elif operator in (b"scn", b"SCN"):
+                if operands and isinstance(operands[-1], NameObject):
+                    used["/Pattern"].add(str(operands[-1]))
+            elif operator in (b"BDC", b"DP"):
+                if len(operands) > 1 and isinstance(operands[1], NameObject):
+                    used["/Properties"].add(str(operands[1]))
+    except Exception:
+        return None
+    return used
+
+
+def prune_page(page: PageObject) -> Tuple[PageObject, List[Any]]:
+    """
+    Return a copy of the page whose /Resources only holds entries its content references,
+    together with the resource values that were left out.
+
+    The copy keeps the original indirect reference so a PdfWriter maps annotations
+    pointing back at the page (/P) onto the pruned clone rather than the full original.
+    """
+    if "/Resources" not in page:
+        return page, []
+    resources = page["/Resources"]
+    if not isinstance(resources, DictionaryObject):
+        return page, []
+    used = referenced_resource_names(page)
+    if used is None:
+        return page, []
+
+    dropped: List[Any] = []
+    pruned_resources = DictionaryObject()
+    for category, entries in resources.items():
+        entries = entries.get_object()
+        if category not in used or not isinstance(entries, DictionaryObject):
+            pruned_resources[NameObject(category)] = entries
+            continue
+        kept = DictionaryObject()
+        for name, value in entries.items():
+            if name in used[category]:
+                kept[NameObject(name)] = value
+            else:
+                dropped.append(value)
+        if len(kept) > 0:
+            pruned_resources[NameObject(category)] = kept
+    if not dropped:
+        return page, []
+
+    pruned = PageObject(page.pdf, page.indirect_reference)
+    pruned.update(page)
+    pruned[NameObject("/Resources")] = pruned_resources
+    return pruned, dropped
+
+
+def collect_refs(obj: Any, acc: Set[ObjectKey]) -> None:
+    """Collect the indirect objects reachable from obj, without walking into the page tree."""
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, IndirectObject):
+            key = (item.idnum, item.generation)
+            if key in acc:
+                continue
+            resolved = item.get_object()
+            if isinstance(resolved, DictionaryObject) and resolved.get("/Type") in ("/Page", "/Pages"):
+                continue
+            acc.add(key)
+            stack.append(resolved)
+        elif isinstance(item, DictionaryObject):
+            stack.extend(value for key, value in item.items() if key != "/Parent")
+        elif isinstance(item, ArrayObject):
+            stack.extend(item)
+
+
+class ResourcePruner:
+    """
+    Prunes unused shared resources from the pages of each output and keeps a running
+    estimate of the bytes that were not copied.
+    """
+
+    def __init__(self, reader: Any) -> None:
+        self.reader = reader
+        self.bytes_saved = 0
+        self._sizes: Dict[ObjectKey, int] = {}
+
+    def prune_output(self, pages: Sequence[PageObject]) -> List[PageObject]:
+        kept_refs: Set[ObjectKey] = set()
+        dropped_refs: Set[ObjectKey] = set()
+        result: List[PageObject] = []
+        for page in pages:
+            pruned, dropped = prune_page(page)
+            result.append(pruned)
+            if dropped:
+                collect_refs(pruned, kept_refs)
+                for value in dropped:
+                    collect_refs(value, dropped_refs)
+        # A resource dropped from one page may still be used by another page of the same output
+        self.bytes_saved += sum(self._object_size(key) for key in dropped_refs - kept_refs)
+        return result
+
+    def _object_size(self, key: ObjectKey) -> int:
+        size = self._sizes.get(key)
+        if size is None:
+            buf = BytesIO()
+            try:
+                self.reader.get_object(IndirectObject(key[0], key[1], self.reader)).write_to_stream(buf)
+            except Exception:
+                pass
+            size = buf.tell() + _OBJECT_OVERHEAD_BYTES
+            self._sizes[key] = size
+        return size
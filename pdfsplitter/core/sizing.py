@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import re
+import weakref
+from io import BytesIO
+from typing import Dict, FrozenSet, List, Set, Tuple
+
+from pypdf import PdfReader
+from pypdf.generic import IndirectObject
+
+from .resources import ObjectKey, collect_refs
+
+
+# Header, catalog, page tree, trailer and startxref of a small output
+_BASE_OUTPUT_BYTES = 400
+# xref table entry per object
+_XREF_ENTRY_BYTES = 20
+# Per page: its entry in the page tree's /Kids plus the rewritten /Parent
+_PAGE_OVERHEAD_BYTES = 16
+# Overhead of "n 0 obj ... endobj" when an object is serialized on its own
+_OBJECT_WRAPPER_BYTES = 20
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+
+_estimators: "weakref.WeakKeyDictionary[PdfReader, SizeEstimator]" = weakref.WeakKeyDictionary()
+
+
+def estimator_for(reader: PdfReader) -> "SizeEstimator":
+    """Shared estimator for a reader, so planning and writing reuse the computed closures."""
+    estimator = _estimators.get(reader)
+    if estimator is None:
+        estimator = SizeEstimator(reader)
+        _estimators[reader] = estimator
+    return estimator
+
+
+class SizeEstimator:
+    """
+    Estimates the size of an output from its pages' object closures, without writing it.
+
+    Objects stored directly in the file are sized by the distance from their xref offset
+    to the next object's offset, which is exactly what a copy of them costs. Objects inside
+    object streams have no offset of their own; those are serialized once and cached.
+    Objects shared by several pages of an output are counted once.
+    """
+
+    def __init__(self, reader: PdfReader) -> None:
+        self.reader = reader
+        self._sizes = _sizes_from_offsets(reader)
+        self._closures: Dict[int, FrozenSet[ObjectKey]] = {}
+
+    def page_objects(self, index: int) -> FrozenSet[ObjectKey]:
+        """Every indirect object page `index` needs, including the page itself."""
+        closure = self._closures.get(index)
+        if closure is None:
+            page = self.reader.pages[index]
+            acc: Set[ObjectKey] = set()
+            collect_refs(page, acc)
+            ref = page.indirect_reference
+            if ref is not None:
+                acc.add((ref.idnum, ref.generation))
+            closure = frozenset(acc)
+            self._closures[index] = closure
+        return closure
+
+    def object_size(self, key: ObjectKey) -> int:
+        size = self._sizes.get(key)
+        if size is None:
+            buf = BytesIO()
+            try:
+                self.reader.get_object(IndirectObject(key[0], key[1], self.reader)).write_to_stream(buf)
+            except Exception:
+                pass
+            size = buf.tell() + _OBJECT_WRAPPER_BYTES
+            self._sizes[key] = size
+        return size
+
+    def estimate(self, pages: range) -> int:
+        """Estimated size in bytes of an output holding the given 0-based pages."""
+        objects: Set[ObjectKey] = set()
+        for i in pages:
+            objects |= self.page_objects(i)
+        return (
+            _BASE_OUTPUT_BYTES
+            + _PAGE_OVERHEAD_BYTES * len(pages)
+            + sum(self.object_size(key) + _XREF_ENTRY_BYTES for key in objects)
+        )
+
+    def pack(self, pages: range, budget: int, scale: float = 1.0) -> List[Tuple[range, int]]:
+        """
+        Greedily pack consecutive pages into (pages, estimated bytes) outputs under budget.
+
+        scale multiplies every estimate; correction passes raise it for spans whose real
+        size came out larger than estimated. A page that alone exceeds the budget still
+        gets an output of its own.
+        """
+        outputs: List[Tuple[range, int]] = []
+        start = pages.start
+        objects: Set[ObjectKey] = set()
+        size = _BASE_OUTPUT_BYTES
+        for i in pages:
+            new = self.page_objects(i) - objects
+            added = _PAGE_OVERHEAD_BYTES + sum(self.object_size(key) + _XREF_ENTRY_BYTES for key in new)
+            if i > start and (size + added) * scale > budget:
+                outputs.append((range(start, i), int(size * scale)))
+                start = i
+                objects = set(self.page_objects(i))
+                size = _BASE_OUTPUT_BYTES + _PAGE_OVERHEAD_BYTES + sum(
+                    self.object_size(key) + _XREF_ENTRY_BYTES for key in objects
+                )
+            else:
+                objects |= new
+                size += added
+        if start < pages.stop:
+            outputs.append((range(start, pages.stop), int(size * scale)))
+        return outputs
+
+
+def _sizes_from_offsets(reader: PdfReader) -> Dict[ObjectKey, int]:
+    """Byte size of every object stored directly in the file, from consecutive xref offsets."""
+    located: List[Tuple[int, ObjectKey]] = []
+    for gen, table in reader.xref.items():
+        for num, offset in table.items():
+            if num not in reader.xref_objStm and offset:
+                located.append((offset, (num, gen)))
+    located.sort()
+
+    stream = reader.stream
+    saved = stream.tell()
+    try:
+        stream.seek(0, 2)
+        end = stream.tell()
+        # The last object ends where the cross-reference section starts
+        stream.seek(max(0, end - 1024))
+        match = None
+        for match in _STARTXREF.finditer(stream.read()):
+            pass
+        if match is not None and located and int(match.group(1)) > located[-1][0]:
+            end = int(match.group(1))
+    finally:
+        stream.seek(saved)
+
+    sizes: Dict[ObjectKey, int] = {}
+    for (offset, key), (next_offset, _) in zip(located, located[1:] + [(end, (0, 0))]):
+        sizes[key] = max(0, next_offset - offset)
+    return sizes
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import mmap
+from typing import Any, Optional
+
+from pypdf import PdfReader
+
+
+class InputSource:
+    """
+    An opened input PDF: the reader plus whatever backs its stream.
+
+    Modes:
+      - "memory": pypdf's default, the whole file is read into a private buffer
+      - "file": reads go through a file handle, objects are loaded on demand
+      - "mmap": the file is memory-mapped read-only; the kernel page cache is the
+        only copy, shared by every process that maps the same file
+    """
+
+    def __init__(self, path: str, mode: str = "memory") -> None:
+        self.path = path
+        self.mode = mode
+        self._handle: Optional[Any] = None
+        if mode == "memory":
+            self.reader = PdfReader(path)
+            return
+        if mode not in ("file", "mmap"):
+            raise ValueError(f"Unknown input mode: {mode}")
+        handle = open(path, "rb")
+        try:
+            if mode == "mmap":
+                # The mapping keeps its own reference to the file, so the handle can go
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+                handle.close()
+                handle = mapped
+            self._handle = handle
+            self.reader = PdfReader(handle)
+        except Exception:
+            handle.close()
+            raise
+
+    def close(self) -> None:
+        if self._handle is not None:
+            try:
+                self._handle.close()
+            except (BufferError, OSError):
+                # A live view into the mapping keeps it open until garbage collected
+                pass
+            self._handle = None
+
+    def __enter__(self) -> "InputSource":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def input_mode(mmap_input: bool, memory_limit_mb: Optional[int]) -> str:
+    """Pick the input mode for a job's settings."""
+    if mmap_input:
+        return "mmap"
+    if memory_limit_mb:
+        return "file"
+    return "memory"
@@ -2,171 +2,896 @@ from __future__ import annotations
 
 import os
 import time
-from typing import Callable, List, Optional, Tuple
+from collections import deque
+from contextlib import contextmanager
+from io import BytesIO
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import IO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
-from pypdf import PdfReader, PdfWriter
+from pypdf import PageObject, PdfReader, PdfWriter
 
-from .models import SplitJobParams, SplitJobResult, SplitStrategy
-from .utils import ensure_directory, parse_page_ranges, safe_filename
+from .doc_cache import document_cache
+from .memory import MemoryGuard
+from .models import OutputProfile, PipelineStats, SplitJobParams, SplitJobResult, SplitStrategy
+from .optimize import write_optimized
+from .output import OutputDirectory, fsync_paths, write_buffer
+from .plan import PagePlan, compile_plan, range_label
+from .progress import ProgressReporter
+from .sizing import estimator_for
+from .passthrough import PassthroughUnsupported, write_passthrough
+from .pipeline import WritePipeline
+from .resources import ResourcePruner
+from .source import InputSource, input_mode
+from .utils import RangeParseError, ensure_directory, format_page_spec, parse_page_spec, safe_filename
 
 
 class SplitCancelled(Exception):
     pass
 
 
+# How often the parent polls should_cancel while waiting on worker processes
+_CANCEL_POLL_SECONDS = 0.1
+# Number of batches handed to each worker, so slow batches don't leave others idle
+_BATCHES_PER_WORKER = 4
+# MAX_BYTES: re-pack the remaining pages when the observed size/estimate ratio moves this much
+_SCALE_DRIFT = 0.1
+
+
+@dataclass
+class _SizedResult:
+    output_files: List[str]  # as reserved; see _OutputTracker.final
+    output_bytes: int
+    write_ns: int
+    estimate_error: Optional[float]
+    correction_passes: int
+    oversize_outputs: int
+
+
+@dataclass
+class _BatchResult:
+    outputs: List[Tuple[str, str, str]]  # (reserved path, path written, SHA-256) of each output
+    resource_bytes_saved: int
+    peak_rss_bytes: Optional[int]
+    output_bytes: int
+    write_ns: int
+    cache_evictions: int = 0
+    error: Optional[Exception] = None  # what stopped the batch; outputs are those written before it
+
+
+# The job's input and output directory in a pool worker process, opened once by
+# _init_worker for all its batches
+_worker_source: Optional[InputSource] = None
+_worker_pruner: Optional[ResourcePruner] = None
+_worker_out_dir: Optional[OutputDirectory] = None
+
+
+class _OutputTracker:
+    """
+    Reports each output once its file is in place: progress, then the on_output_written hook.
+
+    Outputs are registered when handed off and completed by path, so one tracker serves
+    direct writes, the I/O pipeline (whose callback runs on the I/O thread) and worker
+    batches alike. An output written under another name than the one reserved for it
+    (taken on disk meanwhile) is reported by the name written; final() maps reserved
+    paths to those names. `done` starts at the number of outputs a previous run already
+    wrote.
+    """
+
+    def __init__(
+        self,
+        report_written: Callable[[int], None],
+        on_output_written: Optional[Callable[[int, Sequence[int], str, str], None]] = None,
+        done: int = 0,
+        progress: Optional[ProgressReporter] = None,
+    ) -> None:
+        self._report_written = report_written
+        self._on_output_written = on_output_written
+        self._progress = progress
+        self._pending: Dict[str, Tuple[int, Sequence[int]]] = {}
+        self._renamed: Dict[str, str] = {}
+        self.done = done
+
+    def submitted(self, k: int, pages: Sequence[int], out_path: str) -> None:
+        self._pending[out_path] = (k, pages)
+
+    def written(self, out_path: str, final_path: str, sha256: str) -> None:
+        k, pages = self._pending.pop(out_path)
+        if final_path != out_path:
+            self._renamed[out_path] = final_path
+        self.done += 1
+        if self._on_output_written is not None:
+            self._on_output_written(k, pages, final_path, sha256)
+        if self._progress is not None:
+            self._progress.advance(len(pages), os.path.getsize(final_path))
+        self._report_written(self.done)
+
+    def final(self, out_path: str) -> str:
+        """The path an output reserved as out_path was written to."""
+        return self._renamed.get(out_path, out_path)
+
+
+def _as_reporter(
+    callback: Optional[Callable[[float, str], None]], max_rate_hz: Optional[float]
+) -> Optional[ProgressReporter]:
+    if callback is None or isinstance(callback, ProgressReporter):
+        return callback
+    return ProgressReporter.for_callback(callback, max_rate_hz)
+
+
+def _memory_limit_bytes(params: SplitJobParams) -> Optional[int]:
+    return params.memory_limit_mb * 1024 * 1024 if params.memory_limit_mb else None
+
+
+def _open_source(params: SplitJobParams) -> InputSource:
+    return InputSource(params.input_path, input_mode(params.mmap_input, params.memory_limit_mb))
+
+
+@contextmanager
+def _open_reader(input_path: str, mode: str, use_cache: bool) -> Iterator[PdfReader]:
+    if use_cache:
+        with document_cache.lease(input_path, mode) as reader:
+            yield reader
+    else:
+        with InputSource(input_path, mode) as source:
+            yield source.reader
+
+
+def _validate_input(input_path: str) -> None:
+    if not os.path.exists(input_path) or not input_path.lower().endswith(".pdf"):
+        raise ValueError("Input file must exist and be a .pdf")
+
+
+def _count_pages(reader: PdfReader) -> int:
+    # Try to access number of pages to validate quickly; raises if encrypted without password.
+    try:
+        num_pages = len(reader.pages)
+    except Exception as exc:
+        raise ValueError(f"Unable to read PDF: {exc}")
+
+    if num_pages == 0:
+        raise ValueError("PDF has no pages")
+    return num_pages
+
+
+def _is_contiguous(pages: Sequence[int]) -> bool:
+    return isinstance(pages, range) and pages.step == 1
+
+
+def _kept_outputs(plan: PagePlan, completed: Dict[int, Tuple[str, str]]) -> Dict[int, str]:
+    """Paths of the completed outputs whose pages still match the plan, by output index."""
+    return {
+        k: path
+        for k, (spec, path) in completed.items()
+        if 0 <= k < len(plan) and spec == format_page_spec(plan.output_pages(k))
+    }
+
+
+def _kept_prefix(completed: Dict[int, Tuple[str, str]], num_pages: int) -> List[Tuple[range, str]]:
+    """
+    MAX_BYTES: the leading completed outputs, as long as they cover consecutive pages from the first.
+
+    Packing depends on the sizes observed while writing, so later outputs cannot be matched
+    against a fresh plan; the pages after this prefix are packed again instead.
+    """
+    kept: List[Tuple[range, str]] = []
+    start = 0
+    while len(kept) in completed:
+        spec, path = completed[len(kept)]
+        try:
+            items = parse_page_spec(spec, num_pages, keep_order=True)
+        except RangeParseError:
+            break
+        if len(items) != 1:
+            break
+        pages = items[0].indices()
+        if pages.step != 1 or pages.start != start or format_page_spec(pages) != spec:
+            break
+        kept.append((pages, path))
+        start = pages.stop
+    return kept
+
+
+def _gather_pages(
+    reader: PdfReader,
+    indices: Sequence[int],
+    should_cancel: Optional[Callable[[], bool]] = None,
+) -> List[PageObject]:
+    """Resolve an output's pages, checking for cancellation between pages."""
+    pages = []
+    for i in indices:
+        if should_cancel and should_cancel():
+            raise SplitCancelled()
+        pages.append(reader.pages[i])
+    return pages
+
+
+def _output_filename(params: SplitJobParams, plan: PagePlan, k: int) -> str:
+    if not plan.numbered:
+        return safe_filename(f"{params.output_prefix}_{plan.label(k)}.pdf")
+    return _numbered_filename(params, k + 1, len(plan), plan.label(k))
+
+
+def _numbered_filename(params: SplitJobParams, number: int, total: int, label: str) -> str:
+    digits = max(params.zero_pad_digits, len(str(total)))
+    return safe_filename(f"{params.output_prefix}_{str(number).zfill(digits)}_{label}.pdf")
+
+
+def _copy_metadata(reader: PdfReader, writer: PdfWriter, preserve_metadata: bool) -> None:
+    try:
+        if preserve_metadata and reader.metadata is not None:
+            writer.add_metadata(reader.metadata)
+    except Exception:
+        # Non-fatal if metadata copy fails
+        pass
+
+
+def _serialize_pages(
+    reader: PdfReader,
+    pages: Sequence[PageObject],
+    f: IO[bytes],
+    params: SplitJobParams,
+    pruner: Optional[ResourcePruner] = None,
+    should_cancel: Optional[Callable[[], bool]] = None,
+) -> None:
+    if pruner is not None:
+        pages = pruner.prune_output(pages)
+    profile = params.profile or OutputProfile.FAST
+    # Raw copying keeps the input's own layout, so it only applies to the fast profile
+    if params.passthrough and profile == OutputProfile.FAST:
+        try:
+            write_passthrough(reader, pages, f, params.preserve_metadata)
+            return
+        except PassthroughUnsupported:
+            # Fall back to a regular PdfWriter copy of this output
+            f.seek(0)
+            f.truncate()
+    writer = PdfWriter()
+    for page in pages:
+        # Odd/even packs put half the document in one output; stay responsive to cancel
+        if should_cancel and should_cancel():
+            raise SplitCancelled()
+        writer.add_page(page)
+    _copy_metadata(reader, writer, params.preserve_metadata)
+    write_optimized(writer, f, profile)
+
+
+def _write_pages(
+    reader: PdfReader,
+    pages: Sequence[PageObject],
+    out_path: str,
+    params: SplitJobParams,
+    pruner: Optional[ResourcePruner] = None,
+    should_cancel: Optional[Callable[[], bool]] = None,
+    out_dir: Optional[OutputDirectory] = None,
+) -> Tuple[str, int, str]:
+    """Write one output file and return the path written (see write_buffer), its size in bytes and SHA-256."""
+    buffer = BytesIO()
+    _serialize_pages(reader, pages, buffer, params, pruner, should_cancel)
+    final_path, sha256 = write_buffer(out_path, buffer, out_dir)
+    return final_path, buffer.tell(), sha256
+
+
+def _emit_output(
+    reader: PdfReader,
+    pages: Sequence[PageObject],
+    out_path: str,
+    params: SplitJobParams,
+    pruner: Optional[ResourcePruner],
+    pipeline: Optional[WritePipeline],
+    out_dir: OutputDirectory,
+    tracker: _OutputTracker,
+    should_cancel: Optional[Callable[[], bool]] = None,
+) -> Tuple[int, int]:
+    """
+    Write one output directly, or serialize it and hand it to the I/O pipeline.
+
+    A direct write is reported to the tracker here; the pipeline reports its own.
+    Returns the output size in bytes and the nanoseconds spent on this thread
+    (excluding time blocked on a full pipeline queue).
+    """
+    t0 = time.perf_counter_ns()
+    if pipeline is None:
+        final_path, size, sha256 = _write_pages(reader, pages, out_path, params, pruner, should_cancel, out_dir)
+        elapsed_ns = time.perf_counter_ns() - t0
+        tracker.written(out_path, final_path, sha256)
+        return size, elapsed_ns
+    buffer = BytesIO()
+    _serialize_pages(reader, pages, buffer, params, pruner, should_cancel)
+    elapsed_ns = time.perf_counter_ns() - t0
+    pipeline.submit(out_path, buffer)
+    return buffer.tell(), elapsed_ns
+
+
+@contextmanager
+def _open_pipeline(
+    depth: Optional[int], on_written: Callable[[str, str, str], None], out_dir: OutputDirectory
+) -> Iterator[Optional[WritePipeline]]:
+    """A WritePipeline when depth is set, aborted if the block raises; None otherwise."""
+    if not depth:
+        yield None
+        return
+    pipeline = WritePipeline(depth, on_written, out_dir)
+    try:
+        yield pipeline
+    except BaseException:
+        pipeline.abort()
+        raise
+
+
+def _finish_pipeline(pipeline: Optional[WritePipeline], serialize_ns: int) -> Optional[PipelineStats]:
+    if pipeline is None:
+        return None
+    stats = pipeline.close()
+    stats.serialize_ms = serialize_ns // 1_000_000
+    return stats
+
+
+def _write_sized_outputs(
+    reader: PdfReader,
+    params: SplitJobParams,
+    plan: PagePlan,
+    out_dir: OutputDirectory,
+    pruner: Optional[ResourcePruner],
+    pipeline: Optional[WritePipeline],
+    guard: MemoryGuard,
+    tracker: _OutputTracker,
+    should_cancel: Optional[Callable[[], bool]],
+    kept: Sequence[Tuple[range, str]] = (),
+) -> _SizedResult:
+    """
+    Write a MAX_BYTES plan, re-packing outputs that come out over budget.
+
+    Every output is serialized into memory before it is named or written. When it is
+    over budget, its pages are re-packed with the estimates scaled by the observed
+    actual/estimated ratio and the pieces are tried in its place, so only outputs within
+    budget, or single pages that cannot be split further, reach the disk. The ratio over
+    everything written so far also re-packs the remaining pages when it drifts, which
+    matters for profiles that compress or deduplicate well below the estimate. Each
+    re-pack counts as one correction pass. `kept` are outputs a previous run of the job
+    already wrote (see _kept_prefix); numbering continues after them.
+    """
+    budget = int(params.max_output_bytes or 0)
+    estimator = estimator_for(reader)
+    if kept:
+        remaining = range(kept[-1][0].stop, len(reader.pages))
+        pending = deque(part for part, _ in estimator.pack(remaining, budget))
+    else:
+        pending = deque(plan.output_pages(k) for k in range(len(plan)))
+    output_files: List[str] = [path for _, path in kept]
+    output_bytes = 0
+    write_ns = 0
+    errors: List[float] = []
+    passes = 0
+    oversize = 0
+    scale = 1.0  # scale the pending outputs were packed with
+    total_estimated = 0
+    while pending:
+        if should_cancel and should_cancel():
+            raise SplitCancelled()
+        pages = pending.popleft()
+        estimated = estimator.estimate(pages)  # type: ignore[arg-type]
+        t0 = time.perf_counter_ns()
+        buffer = BytesIO()
+        _serialize_pages(reader, _gather_pages(reader, pages, should_cancel), buffer, params, pruner, should_cancel)
+        write_ns += time.perf_counter_ns() - t0
+        actual = buffer.tell()
+        if actual > budget and len(pages) > 1:
+            passes += 1
+            parts = [part for part, _ in estimator.pack(pages, budget, scale=actual / estimated)]  # type: ignore[arg-type]
+            if len(parts) == 1:
+                # The scaled estimate still fits; halve so every pass makes progress
+                parts = [pages[:len(pages) // 2], pages[len(pages) // 2:]]
+            pending.extendleft(reversed(parts))
+            continue
+        if actual > budget:
+            oversize += 1
+        errors.append(abs(actual - estimated * scale) / max(actual, estimated * scale, 1))
+
+        total = len(output_files) + 1 + len(pending)
+        out_path = out_dir.reserve(_numbered_filename(params, len(output_files) + 1, total, range_label(pages)))  # type: ignore[arg-type]
+        tracker.submitted(len(output_files), pages, out_path)
+        committed = None
+        if pipeline is not None:
+            pipeline.submit(out_path, buffer)
+        else:
+            t0 = time.perf_counter_ns()
+            committed = write_buffer(out_path, buffer, out_dir)
+            write_ns += time.perf_counter_ns() - t0
+        output_files.append(out_path)
+        output_bytes += actual
+        total_estimated += estimated
+        guard.check(reader)
+        if committed is not None:
+            tracker.written(out_path, *committed)
+
+        observed = output_bytes / total_estimated if total_estimated else 1.0
+        if pending and abs(observed - scale) > _SCALE_DRIFT * scale:
+            # Pending outputs are consecutive spans of the remaining pages
+            passes += 1
+            scale = observed
+            remaining = range(pending[0][0], pending[-1][-1] + 1)
+            pending = deque(part for part, _ in estimator.pack(remaining, budget, scale=scale))
+    return _SizedResult(
+        output_files=output_files,
+        output_bytes=output_bytes,
+        write_ns=write_ns,
+        estimate_error=sum(errors) / len(errors) if errors else None,
+        correction_passes=passes,
+        oversize_outputs=oversize,
+    )
+
+
+def _init_worker(params: SplitJobParams) -> None:
+    """
+    Pool worker initializer: open the job's input once for every batch the worker runs.
+
+    Each worker has its own PdfReader since readers cannot be shared across processes
+    (with mmap_input they all map the same file). It lives as long as the pool does.
+    The worker's OutputDirectory only picks names for outputs whose reserved name was
+    taken on disk by the time they are written.
+    """
+    global _worker_source, _worker_pruner, _worker_out_dir
+    _worker_source = _open_source(params)
+    _worker_pruner = ResourcePruner(_worker_source.reader) if params.prune_resources else None
+    _worker_out_dir = OutputDirectory(params.output_dir)
+
+
+def _write_output_batch(params: SplitJobParams, jobs: List[Tuple[Sequence[int], str, str]]) -> _BatchResult:
+    """
+    Worker-process entry point: write a batch of (page indices, out_path, base name) outputs.
+
+    The memory ceiling applies to the worker's own process. An output that fails ends
+    the batch, and the result carries the error along with the outputs written before
+    it, so they are still reported and checkpointed.
+    """
+    assert _worker_source is not None and _worker_out_dir is not None
+    reader = _worker_source.reader
+    pruner = _worker_pruner
+    saved_before = pruner.bytes_saved if pruner else 0
+    guard = MemoryGuard(_memory_limit_bytes(params))
+    outputs: List[Tuple[str, str, str]] = []
+    output_bytes = 0
+    write_ns = 0
+    error: Optional[Exception] = None
+    try:
+        for pages, out_path, base_name in jobs:
+            _worker_out_dir.claim(out_path, base_name)
+            t0 = time.perf_counter_ns()
+            final_path, size, sha256 = _write_pages(
+                reader, [reader.pages[i] for i in pages], out_path, params, pruner, out_dir=_worker_out_dir
+            )
+            write_ns += time.perf_counter_ns() - t0
+            outputs.append((out_path, final_path, sha256))
+            output_bytes += size
+            guard.check(reader)
+    except Exception as exc:
+        error = exc
+    return _BatchResult(
+        outputs=outputs,
+        resource_bytes_saved=(pruner.bytes_saved if pruner else 0) - saved_before,
+        peak_rss_bytes=guard.peak_rss_bytes(),
+        output_bytes=output_bytes,
+        write_ns=write_ns,
+        cache_evictions=guard.evictions,
+        error=error,
+    )
+
+
 def split_pdf(
     params: SplitJobParams,
     progress_callback: Optional[Callable[[float, str], None]] = None,
     should_cancel: Optional[Callable[[], bool]] = None,
+    on_output_written: Optional[Callable[[int, Sequence[int], str, str], None]] = None,
+    completed_outputs: Optional[Dict[int, Tuple[str, str]]] = None,
 ) -> SplitJobResult:
     """
     Run the PDF split operation based on the provided parameters.
 
-    progress_callback: (0..1, message)
+    progress_callback: (0..1, message), coalesced to params.progress_rate_hz unless it is
+        already a ProgressReporter; the final update is always delivered
     should_cancel: returns True to request cancellation
+    on_output_written: (output index, 0-based pages, path, SHA-256 of the file), called once
+        each file is in place
+    completed_outputs: output index -> (page spec, path) of outputs an earlier run of the same
+        job already wrote. Entries whose pages still match the plan are kept as they are and
+        not written again; the caller is responsible for checking the files themselves.
     """
     start_ns = time.perf_counter_ns()
+    progress = _as_reporter(progress_callback, params.progress_rate_hz)
+    try:
+        if progress:
+            progress(0.0, "Starting...")
+
+        if should_cancel and should_cancel():
+            raise SplitCancelled()
+
+        _validate_input(params.input_path)
+        ensure_directory(params.output_dir)
+
+        guard = MemoryGuard(_memory_limit_bytes(params))
+        mode = input_mode(params.mmap_input, params.memory_limit_mb)
+        with _open_reader(params.input_path, mode, params.use_document_cache) as reader:
+            return _split_with_reader(
+                params,
+                reader,
+                guard,
+                start_ns,
+                progress,
+                should_cancel,
+                on_output_written,
+                completed_outputs or {},
+            )
+    finally:
+        # A cancelled or failed job still shows the last state it reached
+        if progress:
+            progress.flush()
 
-    if progress_callback:
-        progress_callback(0.0, "Starting...")
+
+def _split_with_reader(
+    params: SplitJobParams,
+    reader: PdfReader,
+    guard: MemoryGuard,
+    start_ns: int,
+    progress: Optional[ProgressReporter],
+    should_cancel: Optional[Callable[[], bool]],
+    on_output_written: Optional[Callable[[int, Sequence[int], str, str], None]],
+    completed_outputs: Dict[int, Tuple[str, str]],
+) -> SplitJobResult:
+    """Plan and write the outputs of split_pdf from an already opened reader."""
+    num_pages = _count_pages(reader)
+    plan_start_ns = time.perf_counter_ns()
+    plan = compile_plan(params, num_pages, reader)
+    plan_end_ns = time.perf_counter_ns()
+
+    if progress:
+        progress(0.05, f"Preparing to split {num_pages} pages...")
 
     if should_cancel and should_cancel():
         raise SplitCancelled()
 
-    if not os.path.exists(params.input_path) or not params.input_path.lower().endswith(".pdf"):
-        raise ValueError("Input file must exist and be a .pdf")
+    def report_written(count: int) -> None:
+        if progress:
+            progress(0.05 + 0.9 * (count / max(1, len(plan))), f"Wrote {count}/{len(plan)} files")
 
-    ensure_directory(params.output_dir)
+    pruner = ResourcePruner(reader) if params.prune_resources else None
+    bytes_saved = 0
+    output_bytes = 0
+    write_ns = 0
+    worker_peak_rss: Optional[int] = None
+    worker_evictions = 0
+    pipeline_stats: Optional[PipelineStats] = None
+    sized: Optional[_SizedResult] = None
 
-    reader = PdfReader(params.input_path)
+    out_dir = OutputDirectory(params.output_dir)
+    if params.strategy == SplitStrategy.MAX_BYTES:
+        prefix = _kept_prefix(completed_outputs, num_pages)
+        tracker = _OutputTracker(report_written, on_output_written, len(prefix), progress)
+        if progress:
+            progress.total_pages = num_pages - sum(len(pages) for pages, _ in prefix)
+        # Each output is checked against the budget before the next is planned, so this path is serial
+        with _open_pipeline(params.io_queue_depth, tracker.written, out_dir) as pipeline:
+            sized = _write_sized_outputs(
+                reader, params, plan, out_dir, pruner, pipeline, guard, tracker, should_cancel, prefix
+            )
+            pipeline_stats = _finish_pipeline(pipeline, sized.write_ns)
+        output_files = [tracker.final(path) for path in sized.output_files]
+        output_bytes = sized.output_bytes + sum(os.path.getsize(path) for _, path in prefix)
+        write_ns = sized.write_ns
+        pages_processed = num_pages - sum(len(pages) for pages, _ in prefix)
+    else:
+        kept = _kept_outputs(plan, completed_outputs)
+        tracker = _OutputTracker(report_written, on_output_written, len(kept), progress)
+        if progress:
+            progress.total_pages = plan.page_count - sum(len(plan.output_pages(k)) for k in kept)
+        written: List[Optional[str]] = [kept.get(k) for k in range(len(plan))]
+        output_bytes = sum(os.path.getsize(path) for path in kept.values())
+        missing = [k for k in range(len(plan)) if k not in kept]
+        pages_processed = sum(len(plan.output_pages(k)) for k in missing)
+        if params.workers and params.workers > 1 and len(missing) > 1:
+            # Resolve all names up front so numbering and collision suffixes match the serial path
+            jobs = []
+            for k in missing:
+                base_name = _output_filename(params, plan, k)
+                out_path = out_dir.reserve(base_name)
+                tracker.submitted(k, plan.output_pages(k), out_path)
+                jobs.append((plan.output_pages(k), out_path, base_name))
+                written[k] = out_path
+            batch = _run_parallel(params, jobs, tracker.written, should_cancel)
+            bytes_saved = batch.resource_bytes_saved
+            worker_peak_rss = batch.peak_rss_bytes
+            worker_evictions = batch.cache_evictions
+            output_bytes += batch.output_bytes
+            write_ns = batch.write_ns
+        else:
+            # With a memory ceiling, walk outputs in page order so consecutive outputs share
+            # most of their resolved objects; numbering still follows the plan.
+            if params.memory_limit_mb:
+                missing.sort(key=plan.min_page)
+            # With a pipeline, progress is reported by the I/O stage as files land on disk
+            with _open_pipeline(params.io_queue_depth, tracker.written, out_dir) as pipeline:
+                for k in missing:
+                    if should_cancel and should_cancel():
+                        raise SplitCancelled()
+                    out_path = out_dir.reserve(_output_filename(params, plan, k))
+                    indices = plan.output_pages(k)
+                    pages = _gather_pages(reader, indices, should_cancel)
+                    tracker.submitted(k, indices, out_path)
+                    size, elapsed_ns = _emit_output(
+                        reader, pages, out_path, params, pruner, pipeline, out_dir, tracker, should_cancel
+                    )
+                    output_bytes += size
+                    write_ns += elapsed_ns
+                    guard.check(reader)
+                    written[k] = out_path
+                pipeline_stats = _finish_pipeline(pipeline, write_ns)
+        output_files = [tracker.final(p) for p in written if p is not None]
 
-    # Try to access number of pages to validate quickly; raises if encrypted without password.
+    if params.fsync_outputs:
+        fsync_paths(output_files)
+    duration_ms = int((time.perf_counter_ns() - start_ns) / 1_000_000)
+
+    if should_cancel and should_cancel():
+        raise SplitCancelled()
+
+    if progress:
+        progress(1.0, f"Done in {duration_ms} ms")
+
+    if pruner is not None:
+        bytes_saved += pruner.bytes_saved
+    peak_rss = guard.peak_rss_bytes()
+    if worker_peak_rss is not None:
+        peak_rss = max(peak_rss or 0, worker_peak_rss)
+
+    return SplitJobResult(
+        output_files=output_files,
+        total_pages=num_pages,
+        duration_ms=duration_ms,
+        resource_bytes_saved=bytes_saved,
+        peak_rss_bytes=peak_rss,
+        cache_evictions=guard.evictions + worker_evictions,
+        output_bytes=output_bytes,
+        write_ms=write_ns // 1_000_000,
+        pipeline=pipeline_stats,
+        size_estimate_error=sized.estimate_error if sized else None,
+        correction_passes=sized.correction_passes if sized else 0,
+        oversize_outputs=sized.oversize_outputs if sized else 0,
+        input_bytes=os.path.getsize(params.input_path),
+        pages_processed=pages_processed,
+        open_ms=(plan_start_ns - start_ns) // 1_000_000,
+        plan_ms=(plan_end_ns - plan_start_ns) // 1_000_000,
+    )
+
+
+def split_pdf_batch(
+    input_path: str,
+    plans: Sequence[SplitJobParams],
+    progress_callback: Optional[Callable[[float, str], None]] = None,
+    should_cancel: Optional[Callable[[], bool]] = None,
+) -> List[SplitJobResult]:
+    """
+    Run several split plans against a single parse of one input PDF.
+
+    Every plan's outputs are fed from the same reader, so the file is parsed and each
+    page resolved once. Non-contiguous outputs (odd/even packs, stepped or reverse
+    ranges) are gathered in one shared pass over the pages. Progress covers all plans;
+    one result is returned per plan. Plans are written serially: 'workers' is ignored here.
+    Progress is coalesced to the lowest progress_rate_hz any plan sets.
+    """
+    rate = min((plan.progress_rate_hz for plan in plans if plan.progress_rate_hz), default=None)
+    progress = _as_reporter(progress_callback, rate)
     try:
-        num_pages = len(reader.pages)
-    except Exception as exc:
-        raise ValueError(f"Unable to read PDF: {exc}")
+        return _split_batch(input_path, plans, progress, should_cancel)
+    finally:
+        if progress:
+            progress.flush()
 
-    if num_pages == 0:
-        raise ValueError("PDF has no pages")
 
-    # Determine list of (start,end) 1-based inclusive ranges for output
-    ranges: List[Tuple[int, int]]
-    single_files_labels: Optional[List[str]] = None
-
-    strategy = params.strategy
-    if strategy == SplitStrategy.RANGES:
-        if not params.ranges_text:
-            raise ValueError("Ranges strategy requires 'ranges_text'.")
-        ranges = parse_page_ranges(params.ranges_text, num_pages)
-        single_files_labels = [f"{s}-{e}" if s != e else f"p{s}" for s, e in ranges]
-    elif strategy == SplitStrategy.EACH_PAGE:
-        ranges = [(i, i) for i in range(1, num_pages + 1)]
-        single_files_labels = [f"p{i}" for i in range(1, num_pages + 1)]
-    elif strategy == SplitStrategy.EVERY_N_PAGES:
-        if not params.pages_per_file or params.pages_per_file < 1:
-            raise ValueError("Every N pages strategy requires 'pages_per_file' >= 1.")
-        ranges = []
-        for start in range(1, num_pages + 1, params.pages_per_file):
-            end = min(num_pages, start + params.pages_per_file - 1)
-            ranges.append((start, end))
-        single_files_labels = [f"{s}-{e}" if s != e else f"p{s}" for s, e in ranges]
-    elif strategy == SplitStrategy.ODD_TOGETHER:
-        ranges = []
-        # Special case: odd pages together into one output
-        # We'll treat as a single range list marker using (-1, -1) to indicate special grouping
-        # but simpler: build pages list directly later
-    elif strategy == SplitStrategy.EVEN_TOGETHER:
-        ranges = []
-    else:
-        raise ValueError(f"Unknown split strategy: {strategy}")
+def _split_batch(
+    input_path: str,
+    plans: Sequence[SplitJobParams],
+    progress: Optional[ProgressReporter],
+    should_cancel: Optional[Callable[[], bool]],
+) -> List[SplitJobResult]:
+    start_ns = time.perf_counter_ns()
 
-    if progress_callback:
-        progress_callback(0.05, f"Preparing to split {num_pages} pages...")
+    if progress:
+        progress(0.0, "Starting...")
 
     if should_cancel and should_cancel():
         raise SplitCancelled()
 
-    # Generate output files
-    output_files: List[str] = []
+    if not plans:
+        raise ValueError("At least one split plan is required.")
+    _validate_input(input_path)
+    for plan in plans:
+        if os.path.realpath(plan.input_path) != os.path.realpath(input_path):
+            raise ValueError(f"Plan input '{plan.input_path}' does not match batch input '{input_path}'.")
+        ensure_directory(plan.output_dir)
 
-    def copy_metadata(writer: PdfWriter) -> None:
-        try:
-            if params.preserve_metadata and reader.metadata is not None:
-                writer.add_metadata(reader.metadata)
-        except Exception:
-            # Non-fatal if metadata copy fails
-            pass
-
-    def unique_path(base_dir: str, base_name: str) -> str:
-        candidate = os.path.join(base_dir, base_name)
-        if not os.path.exists(candidate):
-            return candidate
-        root, ext = os.path.splitext(candidate)
-        suffix = 1
-        while True:
-            cand = f"{root}-{suffix}{ext}"
-            if not os.path.exists(cand):
-                return cand
-            suffix += 1
-
-    total_outputs = 0
-
-    if strategy in (SplitStrategy.RANGES, SplitStrategy.EACH_PAGE, SplitStrategy.EVERY_N_PAGES):
-        digits = max(params.zero_pad_digits, len(str(len(ranges))))
-        for index, (start, end) in enumerate(ranges, start=1):
+    limits = [plan.memory_limit_mb for plan in plans if plan.memory_limit_mb]
+    memory_limit_mb = min(limits) if limits else None
+    mode = input_mode(any(plan.mmap_input for plan in plans), memory_limit_mb)
+    guard = MemoryGuard(memory_limit_mb * 1024 * 1024 if memory_limit_mb else None)
+
+    with _open_reader(input_path, mode, all(plan.use_document_cache for plan in plans)) as reader:
+        num_pages = _count_pages(reader)
+        open_ns = time.perf_counter_ns() - start_ns
+        compiled = [compile_plan(plan, num_pages, reader) for plan in plans]
+        plan_ns = time.perf_counter_ns() - start_ns - open_ns
+        total = sum(len(page_plan) for page_plan in compiled)
+
+        if progress:
+            progress.total_pages = sum(page_plan.page_count for page_plan in compiled)
+            progress(0.05, f"Preparing {total} files from {len(plans)} plans over {num_pages} pages...")
+
+        # One pass over the pages gathers every non-contiguous output of every plan
+        gathered: Dict[Tuple[int, int], List[Optional[PageObject]]] = {}
+        # page index -> (plan, output, position within the output) for every use of the page
+        members: Dict[int, List[Tuple[int, int, int]]] = {}
+        for plan_no, page_plan in enumerate(compiled):
+            for out_no in range(len(page_plan)):
+                indices = page_plan.output_pages(out_no)
+                if not _is_contiguous(indices):
+                    gathered[(plan_no, out_no)] = [None] * len(indices)
+                    for pos, i in enumerate(indices):
+                        members.setdefault(i, []).append((plan_no, out_no, pos))
+        for i in sorted(members):
             if should_cancel and should_cancel():
                 raise SplitCancelled()
-            writer = PdfWriter()
-            for i in range(start - 1, end):
-                writer.add_page(reader.pages[i])
-            copy_metadata(writer)
-            label = single_files_labels[index - 1] if single_files_labels else f"{start}-{end}"
-            filename = f"{params.output_prefix}_{str(index).zfill(digits)}_{label}.pdf"
-            filename = safe_filename(filename)
-            out_path = unique_path(params.output_dir, filename)
-            with open(out_path, "wb") as f:
-                writer.write(f)
-            output_files.append(out_path)
-            total_outputs += 1
-            if progress_callback:
-                progress_callback(0.05 + 0.9 * (index / max(1, len(ranges))), f"Wrote {index}/{len(ranges)} files")
-    elif strategy == SplitStrategy.ODD_TOGETHER:
-        writer = PdfWriter()
-        for i in range(0, num_pages):
-            if (i + 1) % 2 == 1:
-                writer.add_page(reader.pages[i])
-        if len(writer.pages) > 0:
-            copy_metadata(writer)
-            filename = safe_filename(f"{params.output_prefix}_odd_pages.pdf")
-            out_path = unique_path(params.output_dir, filename)
-            with open(out_path, "wb") as f:
-                writer.write(f)
-            output_files.append(out_path)
-            total_outputs += 1
-            if progress_callback:
-                progress_callback(0.95, "Wrote odd pages file")
-    elif strategy == SplitStrategy.EVEN_TOGETHER:
-        writer = PdfWriter()
-        for i in range(0, num_pages):
-            if (i + 1) % 2 == 0:
-                writer.add_page(reader.pages[i])
-        if len(writer.pages) > 0:
-            copy_metadata(writer)
-            filename = safe_filename(f"{params.output_prefix}_even_pages.pdf")
-            out_path = unique_path(params.output_dir, filename)
-            with open(out_path, "wb") as f:
-                writer.write(f)
-            output_files.append(out_path)
-            total_outputs += 1
-            if progress_callback:
-                progress_callback(0.95, "Wrote even pages file")
+            page = reader.pages[i]
+            for plan_no, out_no, pos in members[i]:
+                gathered[(plan_no, out_no)][pos] = page
+        setup_ns = time.perf_counter_ns() - start_ns
 
-    duration_ms = int((time.perf_counter_ns() - start_ns) / 1_000_000)
+        # Plans writing into the same directory share one name index
+        out_dirs: Dict[str, OutputDirectory] = {}
+        results: List[SplitJobResult] = []
+        written = 0
+
+        def report_written(count: int) -> None:
+            if progress:
+                progress(0.05 + 0.9 * (count / max(1, total)), f"Wrote {count}/{total} files")
+
+        for plan_no, (plan, page_plan) in enumerate(zip(plans, compiled)):
+            plan_start_ns = time.perf_counter_ns()
+            pruner = ResourcePruner(reader) if plan.prune_resources else None
+            out_dir_key = os.path.realpath(plan.output_dir)
+            if out_dir_key not in out_dirs:
+                out_dirs[out_dir_key] = OutputDirectory(plan.output_dir)
+            output_files: List[str] = []
+            output_bytes = 0
+            write_ns = 0
+            sized: Optional[_SizedResult] = None
+
+            def plan_written(count: int, base: int = written) -> None:
+                report_written(base + count)
+
+            tracker = _OutputTracker(plan_written, progress=progress)
+            with _open_pipeline(plan.io_queue_depth, tracker.written, out_dirs[out_dir_key]) as pipeline:
+                if plan.strategy == SplitStrategy.MAX_BYTES:
+                    sized = _write_sized_outputs(
+                        reader,
+                        plan,
+                        page_plan,
+                        out_dirs[out_dir_key],
+                        pruner,
+                        pipeline,
+                        guard,
+                        tracker,
+                        should_cancel,
+                    )
+                    output_files = sized.output_files
+                    output_bytes = sized.output_bytes
+                    write_ns = sized.write_ns
+                else:
+                    for out_no in range(len(page_plan)):
+                        if should_cancel and should_cancel():
+                            raise SplitCancelled()
+                        indices = page_plan.output_pages(out_no)
+                        pages = gathered.pop((plan_no, out_no), None)
+                        if pages is None:
+                            pages = _gather_pages(reader, indices, should_cancel)
+                        out_path = out_dirs[out_dir_key].reserve(_output_filename(plan, page_plan, out_no))
+                        tracker.submitted(out_no, indices, out_path)
+                        size, elapsed_ns = _emit_output(
+                            reader, pages, out_path, plan, pruner, pipeline, out_dirs[out_dir_key], tracker, should_cancel
+                        )
+                        output_bytes += size
+                        write_ns += elapsed_ns
+                        guard.check(reader)
+                        output_files.append(out_path)
+                pipeline_stats = _finish_pipeline(pipeline, write_ns)
+            output_files = [tracker.final(path) for path in output_files]
+            written += len(output_files)
+            if plan.fsync_outputs:
+                fsync_paths(output_files)
+            results.append(
+                SplitJobResult(
+                    output_files=output_files,
+                    total_pages=num_pages,
+                    duration_ms=int((setup_ns + time.perf_counter_ns() - plan_start_ns) / 1_000_000),
+                    resource_bytes_saved=pruner.bytes_saved if pruner else 0,
+                    output_bytes=output_bytes,
+                    write_ms=write_ns // 1_000_000,
+                    pipeline=pipeline_stats,
+                    size_estimate_error=sized.estimate_error if sized else None,
+                    correction_passes=sized.correction_passes if sized else 0,
+                    oversize_outputs=sized.oversize_outputs if sized else 0,
+                    input_bytes=os.path.getsize(input_path),
+                    pages_processed=page_plan.page_count,
+                    # Opening and planning are shared by the batch; each plan reports all of it
+                    open_ms=open_ns // 1_000_000,
+                    plan_ms=plan_ns // 1_000_000,
+                )
+            )
 
     if should_cancel and should_cancel():
         raise SplitCancelled()
 
-    if progress_callback:
-        progress_callback(1.0, f"Done in {duration_ms} ms")
+    peak_rss = guard.peak_rss_bytes()
+    for result in results:
+        result.peak_rss_bytes = peak_rss
+        result.cache_evictions = guard.evictions
 
-    return SplitJobResult(output_files=output_files, total_pages=num_pages, duration_ms=duration_ms)
+    if progress:
+        duration_ms = int((time.perf_counter_ns() - start_ns) / 1_000_000)
+        progress(1.0, f"Done in {duration_ms} ms")
+
+    return results
+
+
+def _run_parallel(
+    params: SplitJobParams,
+    jobs: List[Tuple[Sequence[int], str, str]],
+    on_written: Callable[[str, str, str], None],
+    should_cancel: Optional[Callable[[], bool]],
+) -> _BatchResult:
+    """
+    Write the given outputs in a process pool.
+
+    Batches are consumed in submission order so output ordering and on_written
+    callbacks match the serial path; should_cancel is polled while waiting. A failed
+    batch reports the outputs it wrote before its error is raised, and batches already
+    running when the job is cancelled or fails still finish and report theirs, so every
+    file left on disk has been passed to on_written.
+    Returns the worker batch results merged into one: the outputs written, summed
+    bytes and write time, and the highest peak RSS reported by a worker.
+    """
+    workers = min(int(params.workers or 1), len(jobs))
+    batch_size = max(1, -(-len(jobs) // (workers * _BATCHES_PER_WORKER)))
+    batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+
+    merged = _BatchResult(outputs=[], resource_bytes_saved=0, peak_rss_bytes=None, output_bytes=0, write_ns=0)
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(params,))
+    futures: List[Future] = []
+    consumed = 0
+    try:
+        futures = [pool.submit(_write_output_batch, params, batch) for batch in batches]
+        for future in futures:
+            while True:
+                if should_cancel and should_cancel():
+                    raise SplitCancelled()
+                done, _ = wait([future], timeout=_CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                if done:
+                    break
+            batch = future.result()
+            merged.resource_bytes_saved += batch.resource_bytes_saved
+            merged.output_bytes += batch.output_bytes
+            merged.write_ns += batch.write_ns
+            merged.cache_evictions += batch.cache_evictions
+            if batch.peak_rss_bytes is not None:
+                merged.peak_rss_bytes = max(merged.peak_rss_bytes or 0, batch.peak_rss_bytes)
+            consumed += 1
+            for output in batch.outputs:
+                merged.outputs.append(output)
+                on_written(*output)
+            if batch.error is not None:
+                raise batch.error
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        for future in futures[consumed:]:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                for output in future.result().outputs:
+                    on_written(*output)
+    return merged
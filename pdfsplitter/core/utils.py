@@ -2,20 +2,36 @@ from __future__ import annotations
 
 import os
 import re
-from typing import Iterable, List, Tuple
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
 
 
 class RangeParseError(ValueError):
     pass
 
 
-def parse_page_ranges(ranges_text: str, num_pages: int) -> List[Tuple[int, int]]:
+class PageRange(NamedTuple):
+    """1-based inclusive page range; step is negative for reverse ranges."""
+
+    start: int
+    end: int
+    step: int = 1
+
+    def indices(self) -> range:
+        """0-based page indices in output order."""
+        return range(self.start - 1, self.end - 1 + (1 if self.step > 0 else -1), self.step)
+
+
+def parse_page_spec(ranges_text: str, num_pages: int, keep_order: bool = False) -> List[PageRange]:
     """
-    Parse a human-friendly page range string into a list of 1-based inclusive ranges.
+    Parse a page range string into PageRange items, one per output.
 
     Supported formats:
       - "1-3, 5, 7-" (to end), "-4" (from start)
-      - Spaces are ignored; duplicates are removed and merged
+      - "1-100:2" every second page, "10-1" reverse order, "20-1:5" both
+      - Spaces are ignored
+    By default plain ascending ranges are sorted, de-duplicated and merged, and stepped or
+    reverse items are placed among them by their first page. With keep_order every item
+    is kept as its own range, in the order written.
     Raises RangeParseError with a helpful message when invalid.
     """
     if not ranges_text or not ranges_text.strip():
@@ -26,45 +42,91 @@ def parse_page_ranges(ranges_text: str, num_pages: int) -> List[Tuple[int, int]]
     if not parts:
         raise RangeParseError("No valid ranges found.")
 
-    ranges: List[Tuple[int, int]] = []
+    ranges: List[PageRange] = []
     for part in parts:
-        if part == "-":
-            raise RangeParseError("'-' is not a valid range by itself.")
-        if "-" in part:
-            start_str, end_str = part.split("-", 1)
-            start = 1 if start_str == "" else _parse_positive_int(start_str, "range start")
-            end = num_pages if end_str == "" else _parse_positive_int(end_str, "range end")
-            if start < 1 or end < 1:
-                raise RangeParseError("Page numbers must be >= 1.")
-            if start > end:
-                raise RangeParseError(f"Range start {start} is greater than end {end}.")
-            if start > num_pages:
-                continue  # silently skip beyond end
-            end = min(end, num_pages)
-            ranges.append((start, end))
-        else:
-            page = _parse_positive_int(part, "page number")
-            if page < 1:
-                raise RangeParseError("Page numbers must be >= 1.")
-            if page > num_pages:
-                continue
-            ranges.append((page, page))
-
-    # merge overlaps and sort
-    ranges.sort(key=lambda r: (r[0], r[1]))
-    merged: List[Tuple[int, int]] = []
-    for start, end in ranges:
-        if not merged:
-            merged.append((start, end))
+        item = _parse_range_item(part, num_pages)
+        if item is not None:
+            ranges.append(item)
+    if keep_order:
+        return ranges
+
+    # merge overlapping plain ranges and sort everything by first page
+    plain = sorted((r for r in ranges if r.step == 1), key=lambda r: (r.start, r.end))
+    merged: List[PageRange] = []
+    for r in plain:
+        if merged and r.start <= merged[-1].end + 1:
+            last = merged[-1]
+            merged[-1] = PageRange(last.start, max(last.end, r.end))
         else:
-            last_start, last_end = merged[-1]
-            if start <= last_end + 1:
-                merged[-1] = (last_start, max(last_end, end))
-            else:
-                merged.append((start, end))
+            merged.append(r)
+    merged.extend(r for r in ranges if r.step != 1)
+    merged.sort(key=lambda r: (r.start, r.end))
     return merged
 
 
+def parse_page_ranges(ranges_text: str, num_pages: int) -> List[Tuple[int, int]]:
+    """
+    Parse a page range string into a sorted, merged list of 1-based inclusive ranges.
+
+    Only plain ranges are accepted here; see parse_page_spec for steps and reverse order.
+    """
+    ranges = parse_page_spec(ranges_text, num_pages)
+    if any(r.step != 1 for r in ranges):
+        raise RangeParseError("Stepped and reverse ranges are not supported here.")
+    return [(r.start, r.end) for r in ranges]
+
+
+def format_page_spec(pages: Sequence[int]) -> str:
+    """1-based page spec for 0-based page indices, in the syntax parse_page_spec reads back."""
+    if isinstance(pages, range) and pages:
+        first, last = pages[0] + 1, pages[-1] + 1
+        if len(pages) == 1:
+            return str(first)
+        if abs(pages.step) == 1:
+            return f"{first}-{last}"
+        return f"{first}-{last}:{abs(pages.step)}"
+    return ",".join(str(i + 1) for i in pages)
+
+
+def _parse_range_item(part: str, num_pages: int) -> Optional[PageRange]:
+    """One comma-separated item, clamped to the document; None when it selects no pages."""
+    if part == "-":
+        raise RangeParseError("'-' is not a valid range by itself.")
+    step = 1
+    if ":" in part:
+        part, step_str = part.split(":", 1)
+        step = _parse_positive_int(step_str, "step")
+        if step < 1:
+            raise RangeParseError("Step must be >= 1.")
+        if "-" not in part:
+            raise RangeParseError(f"A step needs a range, not a single page: '{part}:{step_str}'.")
+    if "-" not in part:
+        page = _parse_positive_int(part, "page number")
+        if page < 1:
+            raise RangeParseError("Page numbers must be >= 1.")
+        return PageRange(page, page) if page <= num_pages else None
+
+    start_str, end_str = part.split("-", 1)
+    start = 1 if start_str == "" else _parse_positive_int(start_str, "range start")
+    end = num_pages if end_str == "" else _parse_positive_int(end_str, "range end")
+    if start < 1 or end < 1:
+        raise RangeParseError("Page numbers must be >= 1.")
+    if start <= end:
+        if start > num_pages:
+            return None  # silently skip beyond end
+        end = min(end, num_pages)
+        # Make end the last page actually selected, so labels show real pages
+        end -= (end - start) % step
+        return PageRange(start, end, step) if start != end else PageRange(start, start)
+    # Reverse range: start from the highest selected page that exists
+    if start > num_pages:
+        start -= -(-(start - num_pages) // step) * step
+        if start < end:
+            return None
+    end += (start - end) % step
+    return PageRange(start, end, -step) if start != end else PageRange(start, start)
+
+
 def _parse_positive_int(text: str, label: str) -> int:
     if not re.fullmatch(r"\d+", text):
         raise RangeParseError(f"Invalid {label}: '{text}'.")
@@ -92,3 +154,13 @@ def humanize_ms(ms: int) -> str:
     minutes = int(seconds // 60)
     rem = seconds - minutes * 60
     return f"{minutes} min {int(rem)} s"
+
+
+def humanize_bytes(num: float) -> str:
+    if num < 1024:
+        return f"{int(num)} B"
+    for unit in ("KB", "MB"):
+        num /= 1024
+        if num < 1024:
+            return f"{num:.1f} {unit}"
+    return f"{num / 1024:.1f} GB"